@@ -1,13 +1,19 @@
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import json
 import uuid
+import shutil
 import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 from document_processor import DocumentProcessor
-from config import ALLOWED_EXTENSIONS, UPLOAD_FOLDER
+from config import (
+    ALLOWED_EXTENSIONS, UPLOAD_FOLDER, BULK_MAX_WORKERS, BULK_MAX_IN_FLIGHT,
+    BULK_MAX_FILES, BULK_MAX_MEMBER_SIZE, BULK_MAX_CONTENT_LENGTH
+)
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -25,9 +31,95 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 # Initialize document processor
 doc_processor = DocumentProcessor()
 
+# Worker pool for the bulk API (threads are only started on first use)
+bulk_executor = ThreadPoolExecutor(max_workers=BULK_MAX_WORKERS, thread_name_prefix='bulk')
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _spool_to_temp(name, source):
+    """Copy a file-like object to a temporary file that keeps the original extension"""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(name)[1].lower())
+    try:
+        with temp_file:
+            shutil.copyfileobj(source, temp_file)
+    except BaseException:
+        # Don't leave a partial copy behind (corrupt member, client disconnect, ...)
+        os.unlink(temp_file.name)
+        raise
+    return temp_file.name
+
+def _iter_bulk_documents(uploads):
+    """
+    Lazily yield (filename, temp_path, error) for every uploaded document
+
+    Zip archives are read member by member, so only the documents currently being
+    processed are written to disk.
+    """
+    count = 0
+    for upload in uploads:
+        if upload.filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(upload.stream)
+            except Exception as e:
+                logger.error(f"Bulk API Error opening {upload.filename}: {str(e)}")
+                yield upload.filename, None, 'Invalid zip archive'
+                continue
+            with archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    name = f"{upload.filename}/{info.filename}"
+                    if count >= BULK_MAX_FILES:
+                        yield name, None, f'Too many documents (limit {BULK_MAX_FILES})'
+                        return
+                    count += 1
+                    if not allowed_file(info.filename):
+                        yield name, None, 'Invalid file type'
+                    elif info.file_size > BULK_MAX_MEMBER_SIZE:
+                        yield name, None, f'File too large (limit {BULK_MAX_MEMBER_SIZE} bytes)'
+                    else:
+                        # Encrypted members, unsupported compression and CRC errors only
+                        # fail this member, not the whole stream
+                        try:
+                            with archive.open(info) as member:
+                                path = _spool_to_temp(info.filename, member)
+                        except Exception as e:
+                            logger.error(f"Bulk API Error reading {name}: {str(e)}")
+                            yield name, None, f'Could not read archive member: {str(e)}'
+                            continue
+                        yield name, path, None
+        else:
+            if count >= BULK_MAX_FILES:
+                yield upload.filename, None, f'Too many documents (limit {BULK_MAX_FILES})'
+                return
+            count += 1
+            if allowed_file(upload.filename):
+                yield upload.filename, _spool_to_temp(upload.filename, upload.stream), None
+            else:
+                yield upload.filename, None, 'Invalid file type'
+
+def _process_bulk_document(index, filename, path):
+    """Process one document of a bulk request and remove its temporary file"""
+    try:
+        result = doc_processor.process(path)
+    except Exception as e:
+        logger.error(f"Bulk API Error for {filename}: {str(e)}")
+        result = {'success': False, 'error': str(e)}
+    finally:
+        os.unlink(path)
+    return {'index': index, 'filename': filename, **result}
+
+def _submit_bulk_document(index, filename, path):
+    """Queue one bulk document, removing its temporary file if the job is cancelled before it starts"""
+    def remove_if_cancelled(future):
+        if future.cancelled():
+            os.unlink(path)
+
+    future = bulk_executor.submit(_process_bulk_document, index, filename, path)
+    future.add_done_callback(remove_if_cancelled)
+    return future
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -128,5 +220,60 @@ def api_process():
         extensions = ', '.join(ALLOWED_EXTENSIONS)
         return jsonify({'error': f'Invalid file type. Allowed types: {extensions}'}), 400
 
+@app.route('/api/process/bulk', methods=['POST'])
+def api_process_bulk():
+    """
+    Process several documents (or zip archives of documents) in one request
+
+    Documents are processed concurrently on the bulk worker pool and results are
+    streamed back as NDJSON, one line per document in order of completion.
+    """
+    request.max_content_length = BULK_MAX_CONTENT_LENGTH
+    
+    uploads = [
+        upload for upload in request.files.getlist('documents') + request.files.getlist('document')
+        if upload.filename
+    ]
+    if not uploads:
+        return jsonify({'error': 'No files selected'}), 400
+    
+    def generate():
+        documents = _iter_bulk_documents(uploads)
+        pending = {}
+        index = 0
+        exhausted = False
+        
+        try:
+            while True:
+                # Keep the pool busy without spooling more documents than it can work on
+                while not exhausted and len(pending) < BULK_MAX_IN_FLIGHT:
+                    item = next(documents, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    filename, path, error = item
+                    if error:
+                        yield json.dumps({'index': index, 'filename': filename, 'success': False, 'error': error}) + '\n'
+                    else:
+                        future = _submit_bulk_document(index, filename, path)
+                        pending[future] = filename
+                    index += 1
+                
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.pop(future)
+                    yield json.dumps(future.result()) + '\n'
+        finally:
+            # On a client disconnect, drop the documents nobody will read; queued ones are
+            # cancelled (and their files removed), running ones finish and clean up themselves
+            for future in pending:
+                future.cancel()
+            documents.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
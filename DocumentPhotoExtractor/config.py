@@ -22,6 +22,69 @@ UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'docx', 'doc'}
 RESULT_FOLDER = 'results'
 
+# Bulk API (/api/process/bulk): worker pool size, in-flight documents and archive limits
+BULK_MAX_WORKERS = int(os.environ.get("BULK_MAX_WORKERS", os.cpu_count() or 4))
+BULK_MAX_IN_FLIGHT = int(os.environ.get("BULK_MAX_IN_FLIGHT", BULK_MAX_WORKERS * 2))
+BULK_MAX_FILES = int(os.environ.get("BULK_MAX_FILES", "500"))
+BULK_MAX_MEMBER_SIZE = int(os.environ.get("BULK_MAX_MEMBER_SIZE", 32 * 1024 * 1024))
+BULK_MAX_CONTENT_LENGTH = int(os.environ.get("BULK_MAX_CONTENT_LENGTH", 256 * 1024 * 1024))
+
+# Production server (python main.py server --production)
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", os.cpu_count() or 2))
+SERVER_THREADS = int(os.environ.get("SERVER_THREADS", "4"))
+SERVER_MAX_REQUESTS = int(os.environ.get("SERVER_MAX_REQUESTS", "500"))
+SERVER_MAX_REQUESTS_JITTER = int(os.environ.get("SERVER_MAX_REQUESTS_JITTER", "50"))
+SERVER_TIMEOUT = int(os.environ.get("SERVER_TIMEOUT", "300"))
+SERVER_GRACEFUL_TIMEOUT = int(os.environ.get("SERVER_GRACEFUL_TIMEOUT", "60"))
+
+# Heavy libraries imported in the server master before forking workers
+WARMUP_MODULES = ['numpy', 'cv2', 'PIL.Image', 'fitz', 'pdf2image', 'pytesseract', 'docx', 'PyPDF2', 'openai']
+
+# Face image output encoding ('jpeg' or 'webp'); FACE_TARGET_BYTES=0 disables the size search
+FACE_OUTPUT_FORMAT = os.environ.get("FACE_OUTPUT_FORMAT", "jpeg").lower()
+FACE_OUTPUT_QUALITY = int(os.environ.get("FACE_OUTPUT_QUALITY", "85"))
+FACE_MIN_QUALITY = int(os.environ.get("FACE_MIN_QUALITY", "40"))
+FACE_MAX_DIMENSION = int(os.environ.get("FACE_MAX_DIMENSION", "256"))
+FACE_TARGET_BYTES = int(os.environ.get("FACE_TARGET_BYTES", "0"))
+FACE_ENCODING_WORKERS = int(os.environ.get("FACE_ENCODING_WORKERS", "4"))
+
+# Document routing: a quick pre-classification picks the plan that decides which stages run.
+#   ocr: 'auto' (only when extracted text is shorter than ocr_min_text), True or False
+#   faces: run image extraction and face detection
+#   max_images / max_faces: limits on images searched and faces kept (None for no limit)
+#   time_budget: optional per-document time limit in seconds, tighter than DOCUMENT_TIMEOUT
+ROUTING_ENABLED = os.environ.get("ROUTING_ENABLED", "1") != "0"
+PROCESSING_PLANS = {
+    'default': {'ocr': 'auto', 'ocr_min_text': 50, 'faces': True, 'max_images': None, 'max_faces': None},
+    'text_document': {'ocr': False, 'faces': False},
+    'docx_with_images': {'ocr': False, 'faces': True, 'max_images': 5},
+    'text_pdf': {'ocr': False, 'faces': False},
+    'mixed_pdf': {'ocr': 'auto', 'faces': True, 'max_images': 10},
+    'scanned_pdf': {'ocr': 'auto', 'faces': True, 'max_images': 10},
+    'photo_image': {'ocr': 'auto', 'faces': True},
+    'text_image': {'ocr': 'auto', 'faces': False},
+}
+# Per-category settings applied on top of PROCESSING_PLANS, e.g. {'text_pdf': {'faces': True}}
+PROCESSING_PLAN_OVERRIDES = {}
+
+# Time budgets in seconds: the whole document, and each stage within it. Heavy stages run
+# in killable subprocesses when STAGE_ISOLATION is on; a stage that runs out of time is
+# reported in the result's 'timeouts' and the document is returned with what finished.
+DOCUMENT_TIMEOUT = float(os.environ.get("DOCUMENT_TIMEOUT", "240"))
+STAGE_TIMEOUTS = {
+    'classify': 15,
+    'text': 60,
+    'ocr': 120,
+    'faces': 90,
+    'analysis': 90,
+    'face_analysis': 30,
+}
+STAGE_ISOLATION = os.environ.get("STAGE_ISOLATION", "1") != "0"
+STAGE_START_METHOD = os.environ.get("STAGE_START_METHOD")  # default: forkserver where available
+# 'app' is imported by main.py, so preloading it keeps each stage's import of the entry
+# script cheap on Python versions where the fork server cannot preload '__main__' itself
+STAGE_PRELOAD_MODULES = ['document_processor', 'app']
+
 # Supported document types
 SUPPORTED_DOC_TYPES = ['pdf', 'docx', 'image']
 
@@ -29,6 +92,21 @@ SUPPORTED_DOC_TYPES = ['pdf', 'docx', 'image']
 DOCUMENT_TEXT_MODEL = "gpt2"  # Faster model for text processing
 DOCUMENT_VISION_MODEL = "nlpconnect/vit-gpt2-image-captioning"  # Original image captioning model
 
+# Analysis backend: 'openai', or 'fake' for canned local responses (load testing, offline runs)
+ANALYSIS_BACKEND = os.environ.get("ANALYSIS_BACKEND", "openai").lower()
+FAKE_ANALYSIS_LATENCY = float(os.environ.get("FAKE_ANALYSIS_LATENCY", "0.5"))
+
+# Local rule-based extraction (MRZ and document templates) tried before the AI analysis
+LOCAL_EXTRACTION_ENABLED = os.environ.get("LOCAL_EXTRACTION_ENABLED", "1") != "0"
+LOCAL_EXTRACTION_MIN_CONFIDENCE = float(os.environ.get("LOCAL_EXTRACTION_MIN_CONFIDENCE", "0.8"))
+
+# Prompt size limits for AI analysis: text is compacted to ANALYSIS_MAX_CHARS and,
+# if still longer than ANALYSIS_CHUNK_CHARS, analyzed in concurrent chunks
+ANALYSIS_MAX_CHARS = int(os.environ.get("ANALYSIS_MAX_CHARS", "24000"))
+ANALYSIS_CHUNK_CHARS = int(os.environ.get("ANALYSIS_CHUNK_CHARS", "8000"))
+ANALYSIS_MAX_CHUNKS = int(os.environ.get("ANALYSIS_MAX_CHUNKS", "4"))
+ANALYSIS_MAX_WORKERS = int(os.environ.get("ANALYSIS_MAX_WORKERS", "4"))
+
 # Create necessary directories
 os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
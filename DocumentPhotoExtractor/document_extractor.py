@@ -22,6 +22,7 @@ import argparse
 from pathlib import Path
 from document_processor import DocumentProcessor
 from config import DEFAULT_OUTPUT_DIR, SUPPORTED_DOC_TYPES
+from utils.encoding_utils import FORMAT_EXTENSIONS
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
@@ -46,6 +47,10 @@ def save_faces(result, output_dir):
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
+    # Faces are already encoded by the processor; only the file extension depends on the format
+    default_format = result.get('face_format', 'jpeg')
+    face_formats = result.get('face_formats') or []
+    
     # Save each face image
     for i, face_b64 in enumerate(result['face_images']):
         try:
@@ -53,7 +58,9 @@ def save_faces(result, output_dir):
             face_data = base64.b64decode(face_b64)
             
             # Save the image
-            image_path = os.path.join(output_dir, f"face_{i+1}.jpg")
+            face_format = face_formats[i] if i < len(face_formats) else default_format
+            extension = FORMAT_EXTENSIONS.get(face_format, 'jpg')
+            image_path = os.path.join(output_dir, f"face_{i+1}.{extension}")
             with open(image_path, "wb") as f:
                 f.write(face_data)
             
@@ -93,7 +100,7 @@ def display_structured_info(info, indent=0):
             print(f"{padding}{key.replace('_', ' ').title()}: {value}")
 
 def main():
-    """Main function to process documents from command line"""
+    """Main function to process documents from command line, returning the processing result"""
     # Set up argument parser
     parser = argparse.ArgumentParser(
         description="Extract personal information and photos from various document types.",
@@ -183,7 +190,7 @@ Examples:
         # If json-only flag is set, just print the path to the JSON file and exit
         if args.json_only:
             print(result_path)
-            return
+            return result
             
         if result.get('success'):
             print(f"Document Type: {result.get('document_type', 'Unknown').upper()}")
@@ -202,12 +209,19 @@ Examples:
                     for path in face_paths:
                         print(f"  - {os.path.basename(path)}")
             
+            # Flag partial results from stages that ran out of time
+            if result.get('timeouts'):
+                print(f"NOTE: Partial result, timed out during: {', '.join(result['timeouts'])}")
+            
             print("\nEXTRACTED INFORMATION:")
             print(f"{'-'*60}")
             
-            # Display API availability status
-            api_available = result.get('extracted_info', {}).get('api_available', False)
-            if not api_available:
+            # Display API availability status; local rule results never call the API
+            extracted_info = result.get('extracted_info', {})
+            if extracted_info.get('analysis_source') == 'local':
+                print(f"NOTE: Extracted with local rules (confidence {extracted_info.get('confidence')}).")
+                print()
+            elif not extracted_info.get('api_available', False):
                 print("NOTE: Running in fallback mode without AI analysis.")
                 print("To enable AI analysis, provide a valid Hugging Face API key using either:")
                 print("  1. The --api-key parameter: document_extractor.py --api-key YOUR_API_KEY ...")
@@ -221,6 +235,7 @@ Examples:
                 print("No structured information could be extracted from this document.")
             
             print(f"\nFull result saved to: {result_path}")
+            return result
         else:
             print(f"Error: {result.get('error', 'Unknown error')}")
             sys.exit(1)
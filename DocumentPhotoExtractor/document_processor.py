@@ -1,13 +1,106 @@
 import os
+import time
 import logging
 from utils.document_utils import extract_text_from_document, get_document_type
 from utils.image_utils import extract_images, extract_faces
 from utils.ocr_utils import perform_ocr
-# Use OpenAI instead of Hugging Face for better results
-from utils.openai_utils import analyze_document, analyze_image_content
+from utils.rule_utils import extract_with_rules, merge_structured_info
+from utils.text_utils import compact_text, analyze_in_chunks
+from utils.encoding_utils import encode_faces, resolve_output_format, resolve_quality
+from utils.routing_utils import build_plan, select_plan
+from utils.timeout_utils import run_stage, StageTimeout
+from config import (
+    ANALYSIS_BACKEND,
+    DOCUMENT_TIMEOUT, STAGE_TIMEOUTS, STAGE_ISOLATION, STAGE_START_METHOD, STAGE_PRELOAD_MODULES,
+    ROUTING_ENABLED, PROCESSING_PLANS, PROCESSING_PLAN_OVERRIDES,
+    LOCAL_EXTRACTION_ENABLED, LOCAL_EXTRACTION_MIN_CONFIDENCE,
+    ANALYSIS_MAX_CHARS, ANALYSIS_CHUNK_CHARS, ANALYSIS_MAX_CHUNKS, ANALYSIS_MAX_WORKERS,
+    FACE_OUTPUT_FORMAT, FACE_OUTPUT_QUALITY, FACE_MIN_QUALITY, FACE_MAX_DIMENSION,
+    FACE_TARGET_BYTES, FACE_ENCODING_WORKERS
+)
+
+if ANALYSIS_BACKEND == 'fake':
+    # Canned local responses for load tests and offline runs
+    from utils.fake_analysis_utils import analyze_document, analyze_image_content
+else:
+    # Use OpenAI instead of Hugging Face for better results
+    from utils.openai_utils import analyze_document, analyze_image_content
 
 logger = logging.getLogger(__name__)
 
+# Checked once at startup so an unsupported format doesn't fail every face
+FACE_FORMAT = resolve_output_format(FACE_OUTPUT_FORMAT)
+FACE_QUALITY, FACE_QUALITY_FLOOR = resolve_quality(FACE_OUTPUT_QUALITY, FACE_MIN_QUALITY)
+
+def extract_document_faces(file_path, doc_type, max_images=None, max_faces=None):
+    """
+    Extract the document images and detect the faces in them
+    
+    Args:
+        file_path (str): Path to the document file
+        doc_type (str): Type of the document
+        max_images (int, optional): Maximum number of images to search
+        max_faces (int, optional): Stop after this many faces
+        
+    Returns:
+        list: Base64-encoded face images
+    """
+    images = extract_images(file_path, doc_type)[:max_images]
+    logger.debug(f"Extracted {len(images)} images from document")
+    
+    face_images = []
+    for img in images:
+        faces = extract_faces(img)
+        face_images.extend(faces)
+        if max_faces and len(face_images) >= max_faces:
+            return face_images[:max_faces]
+    return face_images
+
+def analyze_text_content(text_content, native_text, ocr_text):
+    """
+    Analyze document text with the local rules, falling back to the AI analysis
+    
+    Args:
+        text_content (str): Combined native and OCR text
+        native_text (str): Text extracted directly from the document
+        ocr_text (str): Text recognised by OCR
+        
+    Returns:
+        tuple: (document_analysis, api_available) - api_available is False when the
+               local rules answered without calling the API
+    """
+    # Try the local rules first; structured documents rarely need the AI model
+    local_analysis = extract_with_rules(text_content) if LOCAL_EXTRACTION_ENABLED else None
+    
+    if local_analysis and local_analysis['confidence'] >= LOCAL_EXTRACTION_MIN_CONFIDENCE:
+        logger.debug(f"Text content analyzed with local rules (confidence {local_analysis['confidence']})")
+        return local_analysis, False
+    
+    # Send a compacted prompt, split into concurrent chunks for long documents
+    analysis_text = compact_text(native_text, ocr_text, max_chars=ANALYSIS_MAX_CHARS)
+    logger.debug(f"Analysis prompt: {len(analysis_text)} of {len(text_content)} characters")
+    document_analysis = analyze_in_chunks(
+        analysis_text,
+        analyze_document,
+        chunk_chars=ANALYSIS_CHUNK_CHARS,
+        max_chunks=ANALYSIS_MAX_CHUNKS,
+        max_workers=ANALYSIS_MAX_WORKERS
+    )
+    api_available = document_analysis.get('api_available', False)
+    
+    if api_available:
+        logger.debug("Text content analyzed with OpenAI")
+    else:
+        logger.warning("Running in fallback mode without AI text analysis")
+    
+    # Fill any gaps left by the AI analysis with the low-confidence local fields
+    if local_analysis:
+        if not isinstance(document_analysis.get('structured_info'), dict):
+            document_analysis['structured_info'] = {}
+        merge_structured_info(document_analysis['structured_info'], local_analysis['structured_info'])
+    
+    return document_analysis, api_available
+
 class DocumentProcessor:
     """
     Main class for processing documents, extracting text, images, and analyzing content
@@ -16,10 +109,47 @@ class DocumentProcessor:
     def __init__(self):
         logger.debug("DocumentProcessor initialized")
     
+    def _run_stage(self, budget, name, func, *args, isolate=True, default=None):
+        """
+        Run one processing stage within its own and the document's remaining time budget
+        
+        Args:
+            budget (dict): Document deadline plus the timings and timeouts recorded so far
+            name (str): Stage name, used to look up STAGE_TIMEOUTS
+            func (callable): Module-level function implementing the stage
+            *args: Arguments for func
+            isolate (bool, optional): Run in a killable subprocess (heavy stages)
+            default (optional): Value returned if the stage times out
+            
+        Returns:
+            The stage result, or default if it timed out
+        """
+        remaining = budget['deadline'] - time.monotonic()
+        timeout = min(STAGE_TIMEOUTS.get(name, remaining), remaining)
+        start = time.monotonic()
+        
+        try:
+            return run_stage(
+                func, *args,
+                timeout=timeout,
+                isolate=isolate and STAGE_ISOLATION,
+                start_method=STAGE_START_METHOD,
+                preload_modules=STAGE_PRELOAD_MODULES
+            )
+        except StageTimeout as e:
+            logger.warning(f"Stage '{name}' timed out: {str(e)}")
+            budget['timeouts'].append(name)
+            return default
+        finally:
+            budget['timings'][name] = round(time.monotonic() - start, 3)
+    
     def process(self, file_path, skip_faces=False):
         """
         Process a document file and extract relevant information
         
+        Each stage runs under a time budget. If a stage times out, the result still holds
+        everything the other stages produced, and 'timeouts' lists the stages that did not finish.
+        
         Args:
             file_path (str): Path to the document file
             skip_faces (bool, optional): Skip face detection and extraction
@@ -27,6 +157,13 @@ class DocumentProcessor:
         Returns:
             dict: Dictionary containing extracted information and faces
         """
+        started = time.monotonic()
+        budget = {
+            'deadline': started + DOCUMENT_TIMEOUT,
+            'timeouts': [],
+            'timings': {},
+        }
+        
         try:
             logger.debug(f"Processing document: {file_path}")
             
@@ -34,15 +171,39 @@ class DocumentProcessor:
             doc_type = get_document_type(file_path)
             logger.debug(f"Document type: {doc_type}")
             
+            # Pick the stages worth running for this kind of document
+            default_plan = build_plan(PROCESSING_PLANS, PROCESSING_PLAN_OVERRIDES)
+            if ROUTING_ENABLED:
+                # Classification only reads headers and a thumbnail, so a thread is enough;
+                # a process per document would cost more than the stage itself
+                plan = self._run_stage(
+                    budget, 'classify', select_plan,
+                    file_path, doc_type, PROCESSING_PLANS, PROCESSING_PLAN_OVERRIDES,
+                    isolate=False, default=default_plan
+                )
+            else:
+                plan = default_plan
+            logger.debug(f"Processing plan: {plan['category']}")
+            
+            # A plan may give its documents a tighter overall budget
+            if plan.get('time_budget'):
+                budget['deadline'] = min(budget['deadline'], started + plan['time_budget'])
+            
             # Extract text from document
-            text_content = extract_text_from_document(file_path, doc_type)
+            text_content = self._run_stage(budget, 'text', extract_text_from_document, file_path, doc_type)
             logger.debug(f"Extracted text length: {len(text_content) if text_content else 0}")
             
-            # If text content is empty or None and document is an image-based format
-            # perform OCR
-            if (not text_content or len(text_content) < 50) and doc_type in ['image', 'pdf']:
+            # Keep native and OCR text apart so the analysis prompt can be deduplicated
+            native_text = text_content
+            ocr_text = None
+            
+            # If the plan allows OCR and text content is empty or None (for 'auto') and
+            # document is an image-based format perform OCR
+            text_insufficient = not text_content or len(text_content) < plan['ocr_min_text']
+            run_ocr = plan['ocr'] is True or (plan['ocr'] == 'auto' and text_insufficient)
+            if run_ocr and doc_type in ['image', 'pdf']:
                 logger.debug("Text content insufficient, performing OCR")
-                ocr_text = perform_ocr(file_path, doc_type)
+                ocr_text = self._run_stage(budget, 'ocr', perform_ocr, file_path, doc_type)
                 
                 if ocr_text:
                     # If we already have some text, combine it with OCR text
@@ -53,32 +214,31 @@ class DocumentProcessor:
                         
                 logger.debug(f"Text after OCR: {len(text_content) if text_content else 0} characters")
             
-            # Extract images from the document
-            images = extract_images(file_path, doc_type)
-            logger.debug(f"Extracted {len(images)} images from document")
-            
-            # Extract faces from the images if not skipped
+            # Extract faces from the document images if not skipped by the caller or the plan
             face_images = []
-            if not skip_faces:
-                for img in images:
-                    faces = extract_faces(img)
-                    face_images.extend(faces)
-                logger.debug(f"Extracted {len(face_images)} faces from images")
-            else:
+            if skip_faces:
                 logger.debug("Face extraction skipped as requested")
+            elif not plan['faces']:
+                logger.debug(f"Face extraction skipped for {plan['category']} documents")
+            else:
+                face_images = self._run_stage(
+                    budget, 'faces', extract_document_faces,
+                    file_path, doc_type, plan['max_images'], plan['max_faces'],
+                    default=[]
+                )
+                logger.debug(f"Extracted {len(face_images)} faces from images")
             
             # Analyze document content
             document_analysis = {}
             api_available = True
             
             if text_content:
-                document_analysis = analyze_document(text_content)
-                api_available = document_analysis.get('api_available', False)
-                
-                if api_available:
-                    logger.debug("Text content analyzed with OpenAI")
-                else:
-                    logger.warning("Running in fallback mode without AI text analysis")
+                # The analysis is mostly waiting on the API, so a thread is enough to bound it
+                document_analysis, api_available = self._run_stage(
+                    budget, 'analysis', analyze_text_content,
+                    text_content, native_text, ocr_text,
+                    isolate=False, default=({}, api_available)
+                )
             
             # If no structured info extracted but we have faces and face extraction not skipped,
             # try analyzing the face images
@@ -90,7 +250,9 @@ class DocumentProcessor:
             if need_face_analysis:
                 logger.debug("Attempting to analyze face images")
                 for i, face in enumerate(face_images[:1]):  # Only analyze first face to save API costs
-                    image_analysis = analyze_image_content(face)
+                    image_analysis = self._run_stage(
+                        budget, 'face_analysis', analyze_image_content, face, isolate=False
+                    )
                     
                     if image_analysis and image_analysis.get('success'):
                         # Merge image analysis with document analysis
@@ -107,12 +269,30 @@ class DocumentProcessor:
             # Add API availability to the document analysis result
             document_analysis['api_available'] = api_available
             
+            # Encode the face crops once for both the response and any saved files
+            face_images, face_formats = encode_faces(
+                face_images,
+                fmt=FACE_FORMAT,
+                quality=FACE_QUALITY,
+                max_dimension=FACE_MAX_DIMENSION,
+                target_bytes=FACE_TARGET_BYTES,
+                min_quality=FACE_QUALITY_FLOOR,
+                max_workers=FACE_ENCODING_WORKERS
+            )
+            
             # Prepare result
             result = {
                 'document_type': doc_type,
                 'extracted_info': document_analysis,
                 'face_count': len(face_images),
-                'face_images': [face.decode('utf-8') if isinstance(face, bytes) else face for face in face_images],
+                'face_images': face_images,
+                'face_format': FACE_FORMAT,
+                'face_formats': face_formats,
+                'processing_plan': plan,
+                'timed_out': bool(budget['timeouts']),
+                'timeouts': budget['timeouts'],
+                'stage_timings': budget['timings'],
+                'processing_time': round(time.monotonic() - started, 3),
                 'success': True
             }
             
@@ -122,5 +302,7 @@ class DocumentProcessor:
             logger.error(f"Error in document processing: {str(e)}", exc_info=True)
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'timeouts': budget['timeouts'],
+                'processing_time': round(time.monotonic() - started, 3)
             }
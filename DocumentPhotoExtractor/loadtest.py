@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Load test for the web application
+
+Replays a synthetic corpus (or a directory of real documents) against /api/process and
+/api/process/bulk at a fixed concurrency and reports throughput, latency percentiles,
+error rates and server memory (RSS) over time.
+
+By default a local server is started with the fake analysis backend (ANALYSIS_BACKEND=fake),
+so no API key is needed and no API calls are made; use --url to target a running server.
+Local rule-based extraction is turned off in that server, because the synthetic documents
+match the SSC template and would otherwise never reach the (fake) analysis; pass
+--local-rules to load the rule path instead.
+
+Usage:
+    python loadtest.py [options]
+
+Examples:
+    python loadtest.py --concurrency 16 --requests 500
+    python loadtest.py --workers 4 --threads 8 --duration 120 --endpoint both
+    python loadtest.py --corpus ./test_docs --fake-latency 1.5 --json-out report.json
+    python loadtest.py --local-rules --endpoint bulk
+    python loadtest.py --url http://staging:5000 --server-pid 12345
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import random
+import signal
+import zipfile
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Paths of the endpoints that can be loaded
+ENDPOINT_PATHS = {
+    'process': '/api/process',
+    'bulk': '/api/process/bulk',
+}
+
+# Lines written into the synthetic documents so the text stages have something to do.
+# They match the local SSC template at full confidence (names must be letters only to
+# pass its name rule), so the analysis they reach depends on --local-rules
+SAMPLE_LINES = [
+    "BOARD OF SECONDARY EDUCATION",
+    "SECONDARY SCHOOL CERTIFICATE",
+    "Certified that: TEST CANDIDATE {letter}",
+    "Father's Name: TEST FATHER",
+    "Mother's Name: TEST MOTHER",
+    "Roll No. {roll}",
+    "Date of Birth: 01/01/2005",
+    "School: TEST HIGH SCHOOL",
+    "Cumulative Grade Point Average (CGPA): 9.{n}",
+]
+
+def _document_lines(n):
+    letter = chr(ord('A') + n % 26)
+    return [line.format(n=n % 10, letter=letter, roll=1000000000 + n) for line in SAMPLE_LINES]
+
+def make_png(n, width=600, height=400):
+    """Grayscale PNG with text-like stripes and a mid-tone 'photo' block"""
+    rows = []
+    for y in range(height):
+        row = bytearray(b'\xff' * width)
+        if 40 <= y < 200:
+            row[420:560] = bytes((120 + (x + y + n) % 60) for x in range(140))
+        if y % 24 < 6 and y > 20:
+            stripe = 40 + (y * 7 + n) % 300
+            row[30:30 + stripe] = b'\x20' * stripe
+        rows.append(b'\x00' + bytes(row))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(b''.join(rows)))
+        + chunk(b'IEND', b'')
+    )
+
+def make_pdf(n, pages=2):
+    """Minimal text PDF"""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for page in range(pages):
+        text = '\n'.join(
+            f"BT /F1 12 Tf 50 {750 - i * 18} Td ({line}) Tj ET"
+            for i, line in enumerate(_document_lines(n) + [f"Page {page + 1} of {pages}"])
+        ).encode()
+        objects.append(b'<< /Length %d >>\nstream\n' % len(text) + text + b'\nendstream')
+        content_id = len(objects)
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> '
+            b'/Contents %d 0 R >>' % content_id
+        )
+        kids.append(b'%d 0 R' % len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [' + b' '.join(kids) + b'] /Count %d >>' % pages
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % i + body + b'\nendobj\n'
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(output)
+
+def make_docx(n):
+    """Minimal DOCX with one paragraph per line"""
+    paragraphs = ''.join(f'<w:p><w:r><w:t>{line}</w:t></w:r></w:p>' for line in _document_lines(n))
+    files = {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="word/document.xml"/></Relationships>'
+        ),
+        'word/document.xml': (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{paragraphs}</w:body></w:document>'
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+def build_corpus(size, corpus_dir=None):
+    """
+    Load documents from corpus_dir, or generate a synthetic mix of PNG, PDF and DOCX files
+
+    Returns:
+        list: (filename, bytes) pairs
+    """
+    if corpus_dir:
+        corpus = []
+        for name in sorted(os.listdir(corpus_dir)):
+            path = os.path.join(corpus_dir, name)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    corpus.append((name, f.read()))
+        return corpus
+
+    generators = [('png', make_png), ('pdf', make_pdf), ('docx', make_docx)]
+    corpus = []
+    for i in range(size):
+        ext, generator = generators[i % len(generators)]
+        corpus.append((f"synthetic_{i}.{ext}", generator(i)))
+    return corpus
+
+def _read_kb(path, key):
+    with open(path) as f:
+        for line in f:
+            if line.startswith(key):
+                return int(line.split()[1])
+    return 0
+
+def process_rss(pid):
+    """
+    Memory in MB of a process and all its descendants (Linux /proc)
+
+    RSS counts pages shared copy-on-write between workers once per worker; PSS splits
+    them between the sharing processes, so it is the better measure of a pre-fork server.
+
+    Returns:
+        tuple: (rss_mb, pss_mb, process_count)
+    """
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                parents.setdefault(int(fields[1]), []).append(int(entry))
+            except (OSError, IndexError):
+                continue
+
+    rss_kb = 0
+    pss_kb = 0
+    count = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            rss_kb += _read_kb(f'/proc/{current}/status', 'VmRSS:')
+            count += 1
+        except OSError:
+            continue
+        try:
+            pss_kb += _read_kb(f'/proc/{current}/smaps_rollup', 'Pss:')
+        except OSError:
+            pass
+        stack.extend(parents.get(current, []))
+    return rss_kb / 1024, pss_kb / 1024, count
+
+class RssSampler(threading.Thread):
+    """Background thread recording server RSS at a fixed interval"""
+
+    def __init__(self, pid, interval):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.started = time.monotonic()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            rss_mb, pss_mb, processes = process_rss(self.pid)
+            self.samples.append({
+                'time': round(time.monotonic() - self.started, 1),
+                'rss_mb': round(rss_mb, 1),
+                'pss_mb': round(pss_mb, 1),
+                'processes': processes,
+            })
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def start_server(args):
+    """Start a local server with the fake analysis backend and wait until it answers"""
+    env = dict(
+        os.environ,
+        ANALYSIS_BACKEND='fake',
+        FAKE_ANALYSIS_LATENCY=str(args.fake_latency),
+        LOCAL_EXTRACTION_ENABLED='1' if args.local_rules else '0',
+    )
+    command = [sys.executable, 'main.py', 'server', '--host', '127.0.0.1', '--port', str(args.port), '--no-debug']
+    if not args.dev_server:
+        command += ['--production', '--workers', str(args.workers), '--threads', str(args.threads)]
+
+    server = subprocess.Popen(
+        command,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL if not args.verbose else None,
+        stderr=subprocess.DEVNULL if not args.verbose else None,
+    )
+
+    url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited during startup with code {server.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return server, url
+        except requests.RequestException:
+            time.sleep(0.25)
+
+    server.terminate()
+    raise RuntimeError(f"Server did not start within {args.startup_timeout}s")
+
+def send_single(session, url, documents):
+    """POST one document to /api/process; returns the number of failed documents"""
+    filename, data = documents[0]
+    response = session.post(f"{url}{ENDPOINT_PATHS['process']}", files={'document': (filename, data)}, timeout=600)
+    response.raise_for_status()
+    return 0 if response.json().get('success') else 1
+
+def send_bulk(session, url, documents):
+    """POST a batch to /api/process/bulk and read the NDJSON stream; returns the number of failed documents"""
+    files = [('documents', (filename, data)) for filename, data in documents]
+    response = session.post(f"{url}{ENDPOINT_PATHS['bulk']}", files=files, stream=True, timeout=600)
+    response.raise_for_status()
+
+    received = 0
+    errors = 0
+    for line in response.iter_lines():
+        if line:
+            received += 1
+            if not json.loads(line).get('success'):
+                errors += 1
+    # Documents that never came back count as errors
+    return errors + max(len(documents) - received, 0)
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run_load(url, corpus, args):
+    """
+    Send requests from args.concurrency client threads until the request count or duration is reached
+
+    Returns:
+        dict: Per-endpoint statistics
+    """
+    endpoints = ['process', 'bulk'] if args.endpoint == 'both' else [args.endpoint]
+    stats = {endpoint: {'latencies': [], 'requests': 0, 'request_errors': 0, 'documents': 0, 'document_errors': 0}
+             for endpoint in endpoints}
+    lock = threading.Lock()
+    counter = iter(range(args.requests)) if args.requests else None
+    stop_at = time.monotonic() + args.duration if args.duration else None
+
+    def next_request():
+        with lock:
+            if counter is not None:
+                return next(counter, None)
+            return 0 if time.monotonic() < stop_at else None
+
+    def client(client_id):
+        rng = random.Random(client_id)
+        session = requests.Session()
+        while next_request() is not None:
+            endpoint = rng.choice(endpoints)
+            if endpoint == 'bulk':
+                documents = rng.sample(corpus, min(args.bulk_size, len(corpus)))
+            else:
+                documents = [rng.choice(corpus)]
+
+            started = time.monotonic()
+            try:
+                sender = send_bulk if endpoint == 'bulk' else send_single
+                errors = sender(session, url, documents)
+                failed = False
+            except (requests.RequestException, ValueError):
+                # HTTP errors, connection failures and unparseable responses fail the whole request
+                errors = len(documents)
+                failed = True
+            elapsed = time.monotonic() - started
+
+            with lock:
+                endpoint_stats = stats[endpoint]
+                endpoint_stats['latencies'].append(elapsed)
+                endpoint_stats['requests'] += 1
+                endpoint_stats['request_errors'] += 1 if failed else 0
+                endpoint_stats['documents'] += len(documents)
+                endpoint_stats['document_errors'] += errors
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(client, range(args.concurrency)))
+
+    return stats
+
+def summarize(stats, elapsed, rss_samples):
+    report = {'elapsed': round(elapsed, 2), 'endpoints': {}, 'rss': rss_samples}
+    for endpoint, endpoint_stats in stats.items():
+        latencies = endpoint_stats['latencies']
+        report['endpoints'][endpoint] = {
+            'requests': endpoint_stats['requests'],
+            'documents': endpoint_stats['documents'],
+            'requests_per_second': round(endpoint_stats['requests'] / elapsed, 2) if elapsed else 0,
+            'documents_per_second': round(endpoint_stats['documents'] / elapsed, 2) if elapsed else 0,
+            'request_error_rate': round(endpoint_stats['request_errors'] / (endpoint_stats['requests'] or 1), 4),
+            'document_error_rate': round(endpoint_stats['document_errors'] / (endpoint_stats['documents'] or 1), 4),
+            'latency': {
+                'p50': round(percentile(latencies, 50), 3),
+                'p90': round(percentile(latencies, 90), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'p99': round(percentile(latencies, 99), 3),
+                'max': round(max(latencies), 3) if latencies else 0.0,
+            },
+        }
+    return report
+
+def print_report(report):
+    print(f"\n{'='*60}")
+    print(f"LOAD TEST RESULTS ({report['elapsed']}s)")
+    print(f"{'='*60}")
+    for endpoint, result in report['endpoints'].items():
+        latency = result['latency']
+        print(ENDPOINT_PATHS[endpoint])
+        print(f"  Requests: {result['requests']} ({result['requests_per_second']}/s), "
+              f"documents: {result['documents']} ({result['documents_per_second']}/s)")
+        print(f"  Error rate: {result['request_error_rate']:.2%} of requests, "
+              f"{result['document_error_rate']:.2%} of documents")
+        print(f"  Latency: p50 {latency['p50']}s, p90 {latency['p90']}s, p95 {latency['p95']}s, "
+              f"p99 {latency['p99']}s, max {latency['max']}s")
+
+    if report['rss']:
+        peak = max(report['rss'], key=lambda sample: sample['rss_mb'])
+        print(f"Server RSS: start {report['rss'][0]['rss_mb']} MB, peak {peak['rss_mb']} MB "
+              f"at {peak['time']}s, end {report['rss'][-1]['rss_mb']} MB ({report['rss'][-1]['processes']} processes)")
+        print("RSS over time:")
+        step = max(1, len(report['rss']) // 10)
+        for sample in report['rss'][::step]:
+            print(f"  {sample['time']:7.1f}s  RSS {sample['rss_mb']:8.1f} MB  PSS {sample['pss_mb']:8.1f} MB  "
+                  f"({sample['processes']} processes)")
+    print(f"{'='*60}")
+
+def main():
+    """Main function to run the load test from the command line"""
+    parser = argparse.ArgumentParser(
+        description="Load test the document extractor web API with a fake analysis backend.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python loadtest.py --concurrency 16 --requests 500
+  python loadtest.py --workers 4 --threads 8 --duration 120 --endpoint both
+  python loadtest.py --url http://staging:5000 --server-pid 12345
+        """
+    )
+    parser.add_argument('--url', help='Target a running server instead of starting one')
+    parser.add_argument('--server-pid', dest='server_pid', type=int,
+                        help='PID of the target server for RSS sampling (with --url)')
+    parser.add_argument('--endpoint', choices=['process', 'bulk', 'both'], default='process',
+                        help='Endpoint(s) to load (default: process)')
+    parser.add_argument('-c', '--concurrency', type=int, default=8,
+                        help='Number of concurrent clients (default: 8)')
+    parser.add_argument('-n', '--requests', type=int, default=200,
+                        help='Total number of requests (default: 200)')
+    parser.add_argument('-d', '--duration', type=float,
+                        help='Run for this many seconds instead of a fixed request count')
+    parser.add_argument('--bulk-size', dest='bulk_size', type=int, default=10,
+                        help='Documents per bulk request (default: 10)')
+    parser.add_argument('--corpus', help='Directory of documents to replay instead of the synthetic corpus')
+    parser.add_argument('--corpus-size', dest='corpus_size', type=int, default=30,
+                        help='Number of synthetic documents to generate (default: 30)')
+    parser.add_argument('--port', type=int, default=5055,
+                        help='Port for the local server (default: 5055)')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='Worker processes for the local server (default: 2)')
+    parser.add_argument('--threads', type=int, default=4,
+                        help='Threads per worker for the local server (default: 4)')
+    parser.add_argument('--dev-server', dest='dev_server', action='store_true',
+                        help='Start the Flask development server instead of gunicorn')
+    parser.add_argument('--fake-latency', dest='fake_latency', type=float, default=0.5,
+                        help='Seconds each fake analysis call takes (default: 0.5)')
+    parser.add_argument('--local-rules', dest='local_rules', action='store_true',
+                        help='Keep local rule-based extraction on in the local server; the synthetic '
+                             'corpus then matches the SSC rules and skips the fake text analysis')
+    parser.add_argument('--rss-interval', dest='rss_interval', type=float, default=1.0,
+                        help='Seconds between server RSS samples (default: 1.0)')
+    parser.add_argument('--startup-timeout', dest='startup_timeout', type=float, default=60,
+                        help='Seconds to wait for the local server to start (default: 60)')
+    parser.add_argument('--json-out', dest='json_out', help='Write the full report to this JSON file')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show the local server output')
+    args = parser.parse_args()
+
+    if args.duration:
+        args.requests = None
+
+    corpus = build_corpus(args.corpus_size, args.corpus)
+    if not corpus:
+        print("Error: The corpus is empty")
+        sys.exit(1)
+
+    server = None
+    try:
+        if args.url:
+            url = args.url.rstrip('/')
+            server_pid = args.server_pid
+        else:
+            server, url = start_server(args)
+            server_pid = server.pid
+
+        print(f"Load testing {url} with {args.concurrency} clients and {len(corpus)} documents")
+
+        sampler = None
+        if server_pid and os.path.isdir('/proc'):
+            sampler = RssSampler(server_pid, args.rss_interval)
+            sampler.start()
+
+        started = time.monotonic()
+        stats = run_load(url, corpus, args)
+        elapsed = time.monotonic() - started
+
+        if sampler:
+            sampler.stop()
+
+        report = summarize(stats, elapsed, sampler.samples if sampler else [])
+        print_report(report)
+
+        if args.json_out:
+            with open(args.json_out, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Full report saved to: {args.json_out}")
+    finally:
+        if server:
+            # SIGTERM lets gunicorn drain gracefully
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+if __name__ == "__main__":
+    main()
@@ -23,10 +23,12 @@ Examples:
     python main.py extract ./id_card.jpg --output-dir ./results
     python main.py batch ./documents --skip-faces
     python main.py server --port 8080
+    python main.py server --production --workers 4
 """
 
 import sys
 import os
+import time
 import argparse
 from pathlib import Path
 from document_extractor import main as extractor_main
@@ -50,6 +52,7 @@ Examples:
   python main.py extract ./id_card.jpg --output-dir ./results
   python main.py batch ./documents --skip-faces
   python main.py server --port 8080
+  python main.py server --production --workers 4
         """
     )
     
@@ -83,6 +86,8 @@ Examples:
                       help='Skip face detection and extraction')
     batch_parser.add_argument('--recursive', action='store_true',
                       help='Recursively process subdirectories')
+    batch_parser.add_argument('--report-slowest', dest='report_slowest', type=int, default=5,
+                      help='Number of slowest documents to list in the batch summary (default: 5)')
     batch_parser.add_argument('--api-key',
                       help='Hugging Face API key for AI analysis (alternatively use HUGGINGFACE_API_KEY env var)')
     
@@ -94,6 +99,18 @@ Examples:
                       help='Port to bind the server to (default: 5000)')
     server_parser.add_argument('--no-debug', action='store_true',
                       help='Disable debug mode')
+    server_parser.add_argument('--production', action='store_true',
+                      help='Serve with gunicorn (pre-forked workers) instead of the Flask dev server')
+    server_parser.add_argument('--workers', type=int,
+                      help='Number of worker processes in production mode')
+    server_parser.add_argument('--threads', type=int,
+                      help='Number of request threads per worker in production mode')
+    server_parser.add_argument('--max-requests', dest='max_requests', type=int,
+                      help='Recycle a worker after this many requests in production mode (0 disables)')
+    server_parser.add_argument('--timeout', type=int,
+                      help='Seconds before a silent worker is restarted in production mode (0 disables)')
+    server_parser.add_argument('--graceful-timeout', dest='graceful_timeout', type=int,
+                      help='Seconds workers get to finish requests on shutdown in production mode')
 
     # If no arguments, show help
     if len(sys.argv) == 1:
@@ -173,7 +190,8 @@ Examples:
         
         print(f"Found {len(files)} documents to process")
         
-        # Process each file
+        # Process each file, timing each one for the latency summary
+        timings = []
         for i, file_path in enumerate(files):
             print(f"\nProcessing [{i+1}/{len(files)}]: {file_path}")
             
@@ -197,17 +215,32 @@ Examples:
                 sys.argv.append("--skip-faces")
             
             # Call the extractor
+            started = time.monotonic()
+            result = None
             try:
-                extractor_main()
+                result = extractor_main()
             except Exception as e:
                 print(f"Error processing {file_path}: {e}")
                 print("Continuing with next document...\n")
+            timings.append((time.monotonic() - started, file_path, (result or {}).get('timeouts', [])))
             
             # Restore argv
             sys.argv = original_argv
         
         print(f"\n{'='*60}")
         print(f"Batch processing complete. Processed {len(files)} documents.")
+        
+        # Report tail latency so pathological documents stand out
+        if timings and args.report_slowest > 0:
+            durations = sorted(elapsed for elapsed, _, _ in timings)
+            p50 = durations[len(durations) // 2]
+            p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+            print(f"Latency: p50 {p50:.2f}s, p95 {p95:.2f}s, max {durations[-1]:.2f}s")
+            print(f"Documents with timed-out stages: {sum(1 for _, _, timeouts in timings if timeouts)}")
+            print("Slowest documents:")
+            for elapsed, file_path, timeouts in sorted(timings, key=lambda t: t[0], reverse=True)[:args.report_slowest]:
+                note = f"  (timed out: {', '.join(timeouts)})" if timeouts else ""
+                print(f"  {elapsed:7.2f}s  {file_path}{note}")
         print(f"{'='*60}")
         
     elif args.command == "server":
@@ -217,6 +250,25 @@ Examples:
             print("  pip install flask")
             sys.exit(1)
             
+        if args.production:
+            from wsgi import GUNICORN_AVAILABLE, run_production_server
+            if not GUNICORN_AVAILABLE:
+                print("Error: Production mode requires gunicorn.")
+                print("  pip install gunicorn")
+                sys.exit(1)
+            
+            print(f"Starting production server at http://{args.host}:{args.port}")
+            run_production_server(
+                host=args.host,
+                port=args.port,
+                workers=args.workers,
+                threads=args.threads,
+                max_requests=args.max_requests,
+                timeout=args.timeout,
+                graceful_timeout=args.graceful_timeout
+            )
+            return
+        
         # Run the web application
         print(f"Starting web server at http://{args.host}:{args.port}")
         app.run(
@@ -0,0 +1,126 @@
+"""
+Tests for the local rule-based extraction (utils/rule_utils.py)
+
+Run with: python -m pytest test_rule_utils.py
+"""
+
+from utils.rule_utils import (
+    LOW_EVIDENCE_CONFIDENCE, extract_with_rules, merge_structured_info, mrz_check_digit, parse_mrz
+)
+
+# Specimen machine readable zones from ICAO Doc 9303
+TD3_SAMPLE = (
+    "P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<\n"
+    "L898902C36UTO7408122F1204159ZE184226B<<<<<10"
+)
+TD1_SAMPLE = (
+    "I<UTOD231458907<<<<<<<<<<<<<<<\n"
+    "7408122F1204159UTO<<<<<<<<<<<6\n"
+    "ERIKSSON<<ANNA<MARIA<<<<<<<<<<"
+)
+
+def test_mrz_check_digit():
+    assert mrz_check_digit('L898902C3') == '6'
+    assert mrz_check_digit('740812') == '2'
+    assert mrz_check_digit('120415') == '9'
+    assert mrz_check_digit('D23145890') == '7'
+
+def test_parse_mrz_td3():
+    mrz = parse_mrz(TD3_SAMPLE)
+    assert mrz['check_ratio'] == 1.0
+    assert mrz['fields']['surname'] == 'ERIKSSON'
+    assert mrz['fields']['given_names'] == 'ANNA MARIA'
+    assert mrz['fields']['document_number'] == 'L898902C3'
+    assert mrz['fields']['date_of_birth'] == '12/08/74'
+    assert mrz['fields']['sex'] == 'F'
+
+def test_parse_mrz_td1():
+    mrz = parse_mrz(TD1_SAMPLE)
+    assert mrz['check_ratio'] == 1.0
+    assert mrz['fields']['document_number'] == 'D23145890'
+    assert mrz['fields']['surname'] == 'ERIKSSON'
+    assert mrz['fields']['expiry_date'] == '15/04/12'
+
+def test_parse_mrz_counts_bad_check_digits():
+    mrz = parse_mrz(TD3_SAMPLE.replace('L898902C36', 'L898902C35'))
+    assert mrz['check_ratio'] < 1.0
+
+def test_parse_mrz_without_mrz():
+    assert parse_mrz("Name: Ravi Kumar\nDate of Birth: 01/01/1990") is None
+
+def test_mrz_passport_is_confident():
+    result = extract_with_rules(TD3_SAMPLE)
+    assert result['confidence'] == 1.0
+    assert result['structured_info']['personal_info']['name'] == 'ANNA MARIA ERIKSSON'
+
+def test_aadhaar_with_name_is_confident():
+    text = (
+        "Unique Identification Authority of India\n"
+        "Ramesh Kumar\n"
+        "DOB: 12/05/1990\n"
+        "Male\n"
+        "1234 5678 9012\n"
+        "Aadhaar"
+    )
+    result = extract_with_rules(text)
+    assert result['confidence'] == 1.0
+    assert result['structured_info']['personal_info']['name'] == 'Ramesh Kumar'
+
+def test_template_without_name_only_fills_gaps():
+    text = (
+        "Unique Identification Authority of India\n"
+        "DOB: 12/05/1990\n"
+        "Male\n"
+        "1234 5678 9012\n"
+        "Aadhaar"
+    )
+    result = extract_with_rules(text)
+    assert result['confidence'] <= LOW_EVIDENCE_CONFIDENCE
+    assert 'name' not in result['structured_info']['personal_info']
+
+def test_single_keyword_is_low_evidence():
+    text = "Aadhaar\nRamesh Kumar\nDOB: 12/05/1990\n1234 5678 9012"
+    assert extract_with_rules(text)['confidence'] <= LOW_EVIDENCE_CONFIDENCE
+
+def test_keywords_match_whole_words_only():
+    # 'passport' inside another word and 'ifsc' inside a code must not identify a document
+    assert extract_with_rules("Passportsize photo attached\nRef: XIFSCX") is None
+
+def test_ssc_certificate():
+    text = (
+        "BOARD OF SECONDARY EDUCATION\n"
+        "SECONDARY SCHOOL CERTIFICATE\n"
+        "Certified that: RAVI KUMAR\n"
+        "Father's Name: SURESH KUMAR\n"
+        "Roll No. 1234567890\n"
+        "Date of Birth: 01/01/2005\n"
+        "School: GOVT HIGH SCHOOL"
+    )
+    result = extract_with_rules(text)
+    assert result['confidence'] == 1.0
+    info = result['structured_info']
+    assert info['personal_info']['name'] == 'RAVI KUMAR'
+    assert info['document_details']['school'] == 'GOVT HIGH SCHOOL'
+
+def test_name_stops_at_relation():
+    text = "Income Certificate\nCertified that Ravi Kumar son of Suresh Kumar\nAnnual Income: 1,20,000"
+    result = extract_with_rules(text)
+    assert result['structured_info']['personal_info']['name'] == 'Ravi Kumar'
+
+def test_labels_are_anchored_to_line_start():
+    # 'Branch Name' must not be read as the account holder's name
+    text = (
+        "Statement of Account\n"
+        "Branch Name: MG Road\n"
+        "Account Number: 123456789012\n"
+        "IFSC: SBIN0001234"
+    )
+    result = extract_with_rules(text)
+    assert 'name' not in result['structured_info'].get('personal_info', {})
+    assert result['confidence'] <= LOW_EVIDENCE_CONFIDENCE
+
+def test_merge_structured_info_fills_gaps_only():
+    primary = {'personal_info': {'name': 'Ravi Kumar', 'gender': 'Unknown'}}
+    secondary = {'personal_info': {'name': 'R Kumar', 'gender': 'Male', 'date_of_birth': '01/01/1990'}}
+    merge_structured_info(primary, secondary)
+    assert primary['personal_info'] == {'name': 'Ravi Kumar', 'gender': 'Male', 'date_of_birth': '01/01/1990'}
@@ -0,0 +1,64 @@
+"""
+Tests for text compaction and chunking (utils/text_utils.py)
+
+Run with: python -m pytest test_text_utils.py
+"""
+
+from utils.text_utils import analyze_in_chunks, chunk_text, compact_text
+
+def test_ocr_lines_repeating_native_text_are_dropped():
+    native = "Name: Ravi Kumar\nRoll No. 1234567890"
+    ocr = "NAME : RAVI  KUMAR\nRoll No 1234567890\nSchool: Govt High School"
+    assert compact_text(native, ocr) == "Name: Ravi Kumar\nRoll No. 1234567890\nSchool: Govt High School"
+
+def test_repeated_native_lines_are_kept():
+    native = "Subject: A\nGrade: A1\nSubject: B\nGrade: A1"
+    assert compact_text(native) == native
+
+def test_numbers_with_different_punctuation_stay_distinct():
+    assert compact_text("GPA 9.8", "GPA 98") == "GPA 9.8\nGPA 98"
+
+def test_non_latin_lines_are_kept():
+    native = "नाम: रमेश कुमार\nపేరు: రమేష్ కుమార్"
+    assert compact_text(native) == native
+
+def test_boilerplate_is_removed():
+    native = "Page 1 of 2\nName: Ravi Kumar\n-----\n2/2\nContinued\nThis is a computer generated statement"
+    assert compact_text(native) == "Name: Ravi Kumar"
+
+def test_bare_numbers_are_not_page_numbers():
+    native = "Annual Income\n120000\nMarks\n95"
+    assert compact_text(native) == native
+
+def test_compact_text_keeps_field_lines_within_limit():
+    filler = [f"Terms and conditions paragraph {i} applies here" for i in range(50)]
+    native = "\n".join(["Income Certificate"] + filler + ["Name: Ravi Kumar"])
+    result = compact_text(native, max_chars=100)
+    assert len(result) <= 100
+    assert result.startswith("Income Certificate")
+    assert result.endswith("Name: Ravi Kumar")
+
+def test_header_lines_do_not_exceed_limit():
+    native = "\n".join("x" * 40 for _ in range(5))
+    assert len(compact_text(native, max_chars=100)) <= 100
+
+def test_chunk_text_respects_size():
+    text = "\n".join(f"line {i}" for i in range(100))
+    chunks = chunk_text(text, 50)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert "\n".join(chunks) == text
+
+def test_chunk_text_keeps_order_around_long_lines():
+    text = "first\n" + "x" * 25 + "\nlast"
+    assert chunk_text(text, 10) == ["first", "x" * 10, "x" * 10, "x" * 5, "last"]
+
+def test_analyze_in_chunks_merges_results():
+    def analyze(chunk):
+        if "Name" in chunk:
+            info = {'personal_info': {'name': 'Ravi Kumar'}}
+        else:
+            info = {'personal_info': {'date_of_birth': '01/01/1990'}}
+        return {'success': True, 'api_available': True, 'structured_info': info}
+
+    result = analyze_in_chunks("Name: Ravi Kumar\nDate of Birth: 01/01/1990", analyze, chunk_chars=20)
+    assert result['structured_info']['personal_info'] == {'name': 'Ravi Kumar', 'date_of_birth': '01/01/1990'}
@@ -0,0 +1,3 @@
+"""
+Helper modules used by the document processing pipeline
+"""
@@ -0,0 +1,161 @@
+"""
+Output encoding for extracted face images
+
+Face crops are re-encoded once, with a bounded size and quality, and the encoded bytes
+are shared by the JSON/API response and the files written to disk.
+"""
+
+import io
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+# File extension used when saving each supported output format
+FORMAT_EXTENSIONS = {
+    'jpeg': 'jpg',
+    'webp': 'webp',
+}
+
+def resolve_output_format(fmt):
+    """
+    Validate the configured face output format, falling back to JPEG
+
+    Args:
+        fmt (str): Requested format ('jpeg', 'jpg' or 'webp')
+
+    Returns:
+        str: A format this Pillow build can encode
+    """
+    fmt = (fmt or 'jpeg').lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    if fmt not in FORMAT_EXTENSIONS:
+        logger.warning(f"Unsupported face output format '{fmt}', using jpeg")
+        return 'jpeg'
+    if fmt == 'webp' and not features.check('webp'):
+        logger.warning("Pillow was built without WebP support, using jpeg for face images")
+        return 'jpeg'
+    return fmt
+
+def resolve_quality(quality, min_quality):
+    """
+    Validate the configured face quality settings
+
+    Args:
+        quality (int): Encoder quality, clamped to 1-95
+        min_quality (int): Lowest quality for the target-bytes search, clamped to 1-quality
+
+    Returns:
+        tuple: (quality, min_quality)
+    """
+    valid_quality = max(1, min(quality, 95))
+    if valid_quality != quality:
+        logger.warning(f"Face output quality {quality} is out of range, using {valid_quality}")
+    valid_min_quality = max(1, min(min_quality, valid_quality))
+    if valid_min_quality != min_quality:
+        logger.warning(f"Face minimum quality {min_quality} is out of range, using {valid_min_quality}")
+    return valid_quality, valid_min_quality
+
+def _save(image, fmt, quality):
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, format='WEBP', quality=quality, method=4)
+    else:
+        image.save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+def encode_image(image_data, fmt='jpeg', quality=85, max_dimension=None, target_bytes=None, min_quality=40):
+    """
+    Re-encode an image with the given format, quality and size limits
+
+    Args:
+        image_data (bytes): Encoded source image
+        fmt (str, optional): Output format, 'jpeg' or 'webp'
+        quality (int, optional): Encoder quality (1-95)
+        max_dimension (int, optional): Longest side in pixels; larger images are downscaled
+        target_bytes (int, optional): Search for the highest quality that fits in this many bytes
+        min_quality (int, optional): Lowest quality the target-bytes search may use
+
+    Returns:
+        bytes: Encoded image
+    """
+    fmt = fmt.lower()
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unsupported face output format: {fmt}")
+
+    image = Image.open(io.BytesIO(image_data))
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    if max_dimension and max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    encoded = _save(image, fmt, quality)
+    if not target_bytes or len(encoded) <= target_bytes:
+        return encoded
+
+    # Binary search for the highest quality that fits in the byte budget
+    min_quality = min(min_quality, quality)
+    low, high = min_quality, quality - 1
+    best = None
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = _save(image, fmt, mid)
+        if len(candidate) <= target_bytes:
+            best = candidate
+            low = mid + 1
+        else:
+            high = mid - 1
+
+    if best is not None:
+        return best
+    # Nothing fits; the lowest allowed quality is the closest we can get
+    return _save(image, fmt, min_quality) if min_quality < quality else encoded
+
+def encode_faces(faces, fmt='jpeg', quality=85, max_dimension=None, target_bytes=None,
+                 min_quality=40, max_workers=4):
+    """
+    Re-encode base64 face images concurrently
+
+    Args:
+        faces (list): Base64-encoded face images (str or bytes)
+        fmt (str, optional): Output format, 'jpeg' or 'webp'
+        quality (int, optional): Encoder quality (1-95)
+        max_dimension (int, optional): Longest side in pixels
+        target_bytes (int, optional): Byte budget per face
+        min_quality (int, optional): Lowest quality the target-bytes search may use
+        max_workers (int, optional): Number of encoding threads
+
+    Returns:
+        tuple: (faces, formats) - base64-encoded face images and the format of each one,
+               which is fmt unless encoding failed and the face fell back to JPEG
+    """
+    def encode_face(face):
+        face_b64 = face.decode('utf-8') if isinstance(face, bytes) else face
+        face_data = base64.b64decode(face_b64)
+        for face_format in dict.fromkeys((fmt, 'jpeg')):
+            try:
+                encoded = encode_image(
+                    face_data,
+                    fmt=face_format,
+                    quality=quality,
+                    max_dimension=max_dimension,
+                    target_bytes=target_bytes,
+                    min_quality=min_quality
+                )
+                return base64.b64encode(encoded).decode('utf-8'), face_format
+            except Exception as e:
+                logger.error(f"Error encoding face image as {face_format}: {str(e)}")
+        # Keep the original crop rather than losing the face; the extractor produces JPEGs
+        return face_b64, 'jpeg'
+
+    if not faces:
+        return [], []
+
+    # Pillow releases the GIL while encoding, so threads scale across cores
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(faces))) as executor:
+        encoded = list(executor.map(encode_face, faces))
+    return [face for face, _ in encoded], [face_format for _, face_format in encoded]
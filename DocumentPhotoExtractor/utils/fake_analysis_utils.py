@@ -0,0 +1,55 @@
+"""
+Local stand-in for the OpenAI analysis functions
+
+Enabled with ANALYSIS_BACKEND=fake. Returns canned results in the same format as the real
+analysis after a configurable delay, so the pipeline and web server can be load tested
+without API keys, network access or API spend.
+"""
+
+import time
+import logging
+
+from config import FAKE_ANALYSIS_LATENCY
+
+logger = logging.getLogger(__name__)
+
+def analyze_document(text):
+    """
+    Pretend to analyze document text
+
+    Args:
+        text (str): Text content of the document
+
+    Returns:
+        dict: Canned analysis result
+    """
+    time.sleep(FAKE_ANALYSIS_LATENCY)
+    logger.debug(f"Fake analysis of {len(text)} characters")
+    return {
+        'success': True,
+        'api_available': True,
+        'structured_info': {
+            'document_type': 'Unknown',
+            'personal_info': {
+                'name': 'Test Person',
+            },
+            'note': 'Fake analysis backend',
+        },
+    }
+
+def analyze_image_content(image_b64):
+    """
+    Pretend to analyze a face image
+
+    Args:
+        image_b64 (str): Base64-encoded image
+
+    Returns:
+        dict: Canned analysis result
+    """
+    time.sleep(FAKE_ANALYSIS_LATENCY)
+    return {
+        'success': True,
+        'api_available': True,
+        'structured_info': {},
+    }
@@ -0,0 +1,173 @@
+"""
+Document pre-classification and processing plans
+
+A cheap look at the file (header bytes, page count, text density, image coverage and a
+small thumbnail) decides which pipeline stages are worth running. Text-only documents
+skip OCR and face detection entirely; scans, photos and text PDFs carrying a photo keep them.
+"""
+
+import copy
+import logging
+import zipfile
+
+import fitz
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of the formats we can recognise without trusting the extension
+FILE_SIGNATURES = [
+    (b'%PDF', 'pdf'),
+    (b'\x89PNG', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+    (b'BM', 'bmp'),
+    (b'PK\x03\x04', 'zip'),
+]
+
+# Number of PDF pages inspected when estimating text density and image coverage
+SAMPLE_PAGES = 3
+
+# Average characters per page above which a PDF counts as text based
+TEXT_DENSITY_THRESHOLD = 200
+
+# Fraction of the page covered by images above which a PDF counts as scanned
+SCANNED_COVERAGE_THRESHOLD = 0.5
+
+# Smallest placed image (in points, both sides) that could hold a face; a passport
+# photo is about 100x130pt, logos and seals in e-documents are usually much smaller
+MIN_PHOTO_SIZE = 50
+
+# Images whose thumbnail has fewer mid-tone pixels than this are bilevel text scans
+MIDTONE_THRESHOLD = 0.05
+
+def _file_signature(file_path):
+    with open(file_path, 'rb') as f:
+        header = f.read(8)
+    for signature, name in FILE_SIGNATURES:
+        if header.startswith(signature):
+            return name
+    return 'unknown'
+
+def _profile_pdf(file_path):
+    profile = {}
+    with fitz.open(file_path) as pdf:
+        profile['page_count'] = pdf.page_count
+        pages = [pdf[i] for i in range(min(SAMPLE_PAGES, pdf.page_count))]
+
+        text_chars = 0
+        coverage = 0.0
+        photo_images = 0
+        for page in pages:
+            text_chars += len(page.get_text().strip())
+            page_area = abs(page.rect) or 1
+            boxes = [fitz.Rect(info['bbox']) & page.rect for info in page.get_image_info()]
+            coverage += min(sum(abs(box) for box in boxes) / page_area, 1.0)
+            photo_images += sum(1 for box in boxes if min(box.width, box.height) >= MIN_PHOTO_SIZE)
+
+        sampled = len(pages) or 1
+        profile['text_density'] = text_chars / sampled
+        profile['image_coverage'] = round(coverage / sampled, 3)
+        profile['photo_images'] = photo_images
+    return profile
+
+def _profile_image(file_path):
+    with Image.open(file_path) as image:
+        # draft() lets the JPEG decoder skip straight to a reduced size
+        image.draft('L', (128, 128))
+        thumbnail = image.convert('L')
+        thumbnail.thumbnail((64, 64))
+
+    histogram = thumbnail.histogram()
+    total = sum(histogram) or 1
+    midtones = sum(histogram[40:216]) / total
+    return {
+        'page_count': 1,
+        'midtone_ratio': round(midtones, 3),
+    }
+
+def _profile_docx(file_path):
+    with zipfile.ZipFile(file_path) as archive:
+        media = [name for name in archive.namelist() if name.startswith('word/media/')]
+    return {
+        'embedded_images': len(media),
+    }
+
+def classify_document(file_path, doc_type):
+    """
+    Pre-classify a document into a processing category
+
+    Args:
+        file_path (str): Path to the document file
+        doc_type (str): Document type from get_document_type
+
+    Returns:
+        tuple: (category, profile) where profile holds the measurements used
+    """
+    profile = {'signature': _file_signature(file_path)}
+
+    try:
+        if doc_type == 'pdf' and profile['signature'] == 'pdf':
+            profile.update(_profile_pdf(file_path))
+            # Any photo-sized image keeps face detection on: e-Aadhaar and DigiLocker
+            # PDFs are text based but carry a small photo
+            if profile['text_density'] >= TEXT_DENSITY_THRESHOLD and not profile['photo_images']:
+                return 'text_pdf', profile
+            if profile['text_density'] < TEXT_DENSITY_THRESHOLD or profile['image_coverage'] >= SCANNED_COVERAGE_THRESHOLD:
+                return 'scanned_pdf', profile
+            return 'mixed_pdf', profile
+
+        if doc_type == 'docx' and profile['signature'] == 'zip':
+            profile.update(_profile_docx(file_path))
+            return ('docx_with_images' if profile['embedded_images'] else 'text_document'), profile
+
+        if doc_type == 'image':
+            profile.update(_profile_image(file_path))
+            return ('text_image' if profile['midtone_ratio'] < MIDTONE_THRESHOLD else 'photo_image'), profile
+    except Exception as e:
+        logger.warning(f"Could not pre-classify {file_path}: {str(e)}")
+
+    return 'default', profile
+
+def build_plan(plans, overrides=None, category='default', profile=None):
+    """
+    Merge the settings for a category into a processing plan
+
+    Args:
+        plans (dict): Processing plans keyed by category (must include 'default')
+        overrides (dict, optional): Per-category plan settings that take precedence
+        category (str, optional): Category to build the plan for
+        profile (dict, optional): Classification measurements to attach
+
+    Returns:
+        dict: Plan with the stage settings, its category and profile
+    """
+    overrides = overrides or {}
+    plan = copy.deepcopy(plans.get('default', {}))
+    plan.update(overrides.get('default', {}))
+    if category != 'default':
+        plan.update(plans.get(category, {}))
+        plan.update(overrides.get(category, {}))
+
+    plan['category'] = category
+    plan['profile'] = profile or {}
+    return plan
+
+def select_plan(file_path, doc_type, plans, overrides=None):
+    """
+    Choose the processing plan for a document
+
+    Args:
+        file_path (str): Path to the document file
+        doc_type (str): Document type from get_document_type
+        plans (dict): Processing plans keyed by category (must include 'default')
+        overrides (dict, optional): Per-category plan settings that take precedence
+
+    Returns:
+        dict: Plan with the stage settings, its category and the classification profile
+    """
+    category, profile = classify_document(file_path, doc_type)
+    plan = build_plan(plans, overrides, category, profile)
+    logger.debug(f"Processing plan for {file_path}: {plan}")
+    return plan
@@ -0,0 +1,399 @@
+"""
+Local rule-based field extraction
+
+Highly structured documents (passports with an MRZ, SSC certificates, PAN cards, ...)
+can be parsed with regular expressions in a few milliseconds. This module provides that
+fast path: an MRZ parser plus a registry of per-document-type templates. Results use the
+same shape as the AI analysis so the processor can return them directly and only call
+the remote model when the local confidence is low.
+"""
+
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Registered document templates, keyed by document type
+TEMPLATES = {}
+
+# Fields that are useful on any document
+COMMON_FIELDS = {
+    'contact_info.email': re.compile(r'\b([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,})\b'),
+    'contact_info.phone': re.compile(r'(?<![\d])((?:\+91[\s-]?)?[6-9]\d{4}[\s-]?\d{5})(?![\d])'),
+}
+
+# Characters allowed in a machine readable zone line
+MRZ_LINE = re.compile(r'^[A-Z0-9<]{30,44}$')
+
+# Value of each MRZ character for check digit computation
+MRZ_WEIGHTS = (7, 3, 1)
+
+# Templates matching fewer distinct keywords than this are never confident enough
+# to skip the AI analysis; their fields are only used to fill gaps
+MIN_KEYWORD_HITS = 2
+LOW_EVIDENCE_CONFIDENCE = 0.5
+
+# A template result without any of these is never confident enough to skip the AI
+# analysis either; the holder's name is the one field every document must yield
+NAME_FIELDS = ('personal_info.name', 'personal_info.surname', 'personal_info.given_names')
+
+def register_template(doc_type, label, keywords, fields, required=()):
+    """
+    Register a rule template for a document type
+
+    Args:
+        doc_type (str): Key of the document type (e.g. 'pan_card')
+        label (str): Human readable document type reported in structured_info
+        keywords (list): Phrases that identify the document (case-insensitive)
+        fields (dict): Mapping of 'section.field' to a regex with one capture group
+        required (tuple, optional): Fields that must be found for full confidence
+    """
+    TEMPLATES[doc_type] = {
+        'label': label,
+        'keywords': [re.compile(r'\b' + re.escape(keyword) + r'\b', re.IGNORECASE) for keyword in keywords],
+        'fields': {
+            name: re.compile(pattern, re.IGNORECASE | re.MULTILINE) if isinstance(pattern, str) else pattern
+            for name, pattern in fields.items()
+        },
+        'required': tuple(required),
+    }
+
+def _clean_value(value):
+    """Collapse whitespace and strip punctuation left over from OCR"""
+    return re.sub(r'\s+', ' ', value).strip(' :.-,|')
+
+def _set_field(info, dotted_name, value):
+    """Set a 'section.field' value in a nested structured_info dictionary"""
+    section, _, field = dotted_name.rpartition('.')
+    target = info.setdefault(section, {}) if section else info
+    target.setdefault(field, value)
+
+def _mrz_char_value(char):
+    if char.isdigit():
+        return int(char)
+    if char.isalpha():
+        return ord(char) - ord('A') + 10
+    return 0
+
+def mrz_check_digit(data):
+    """
+    Compute the ICAO 9303 check digit for an MRZ field
+
+    Args:
+        data (str): MRZ field characters
+
+    Returns:
+        str: Single check digit
+    """
+    total = sum(_mrz_char_value(char) * MRZ_WEIGHTS[i % 3] for i, char in enumerate(data))
+    return str(total % 10)
+
+def _mrz_date(value):
+    """Convert a YYMMDD MRZ date to DD/MM/YY, leaving invalid values untouched"""
+    if not value.isdigit():
+        return value
+    return f"{value[4:6]}/{value[2:4]}/{value[0:2]}"
+
+def _mrz_names(value):
+    surname, _, given = value.partition('<<')
+    return (
+        surname.replace('<', ' ').strip(),
+        given.replace('<', ' ').strip(),
+    )
+
+def _find_mrz_lines(text):
+    """Return candidate MRZ lines from the text, normalised for common OCR noise"""
+    lines = []
+    for line in text.splitlines():
+        candidate = re.sub(r'\s+', '', line.upper()).replace('«', '<')
+        if MRZ_LINE.match(candidate) and '<' in candidate:
+            lines.append(candidate)
+    return lines
+
+def parse_mrz(text):
+    """
+    Parse a passport (TD3) or ID card (TD1) machine readable zone
+
+    Args:
+        text (str): Document text that may contain an MRZ
+
+    Returns:
+        dict: Parsed fields and the fraction of valid check digits, or None if no MRZ found
+    """
+    lines = _find_mrz_lines(text)
+
+    for i in range(len(lines)):
+        # TD3: two lines of 44 characters (passports)
+        if len(lines[i]) == 44 and i + 1 < len(lines) and len(lines[i + 1]) == 44:
+            first, second = lines[i], lines[i + 1]
+            surname, given = _mrz_names(first[5:])
+            checks = [
+                (second[0:9], second[9]),
+                (second[13:19], second[19]),
+                (second[21:27], second[27]),
+                (second[0:10] + second[13:20] + second[21:43], second[43]),
+            ]
+            fields = {
+                'document_code': first[0:2].replace('<', ''),
+                'issuing_country': first[2:5].replace('<', ''),
+                'surname': surname,
+                'given_names': given,
+                'document_number': second[0:9].replace('<', ''),
+                'nationality': second[10:13].replace('<', ''),
+                'date_of_birth': _mrz_date(second[13:19]),
+                'sex': second[20].replace('<', ''),
+                'expiry_date': _mrz_date(second[21:27]),
+            }
+            break
+
+        # TD1: three lines of 30 characters (identity cards)
+        if len(lines[i]) == 30 and i + 2 < len(lines) and len(lines[i + 1]) == 30 and len(lines[i + 2]) == 30:
+            first, second, third = lines[i], lines[i + 1], lines[i + 2]
+            surname, given = _mrz_names(third)
+            checks = [
+                (first[5:14], first[14]),
+                (second[0:6], second[6]),
+                (second[8:14], second[14]),
+                (first[5:30] + second[0:7] + second[8:15] + second[18:29], second[29]),
+            ]
+            fields = {
+                'document_code': first[0:2].replace('<', ''),
+                'issuing_country': first[2:5].replace('<', ''),
+                'surname': surname,
+                'given_names': given,
+                'document_number': first[5:14].replace('<', ''),
+                'nationality': second[15:18].replace('<', ''),
+                'date_of_birth': _mrz_date(second[0:6]),
+                'sex': second[7].replace('<', ''),
+                'expiry_date': _mrz_date(second[8:14]),
+            }
+            break
+    else:
+        return None
+
+    valid = sum(1 for data, digit in checks if mrz_check_digit(data) == digit)
+    return {
+        'fields': fields,
+        'check_ratio': valid / len(checks),
+    }
+
+def _mrz_analysis(mrz):
+    fields = mrz['fields']
+    doc_label = 'Passport' if fields['document_code'].startswith('P') else 'Identity Card'
+    name = ' '.join(part for part in (fields['given_names'], fields['surname']) if part)
+
+    structured_info = {
+        'document_type': doc_label,
+        'personal_info': {
+            'name': name,
+            'surname': fields['surname'],
+            'given_names': fields['given_names'],
+            'date_of_birth': fields['date_of_birth'],
+            'gender': fields['sex'],
+            'nationality': fields['nationality'],
+        },
+        'document_details': {
+            'document_number': fields['document_number'],
+            'issuing_country': fields['issuing_country'],
+            'expiry_date': fields['expiry_date'],
+        },
+    }
+    # A fully valid MRZ is as reliable as it gets; each failed check digit lowers trust
+    return structured_info, 0.5 + 0.5 * mrz['check_ratio']
+
+def _template_analysis(text, doc_type, template):
+    keyword_hits = sum(1 for keyword in template['keywords'] if keyword.search(text))
+    if not keyword_hits:
+        return None, 0.0
+
+    structured_info = {'document_type': template['label']}
+    found = set()
+    for name, pattern in template['fields'].items():
+        match = pattern.search(text)
+        if match:
+            value = _clean_value(match.group(1))
+            if value:
+                _set_field(structured_info, name, value)
+                found.add(name)
+
+    keyword_score = min(keyword_hits / 2, 1.0)
+    if template['required']:
+        field_score = sum(1 for name in template['required'] if name in found) / len(template['required'])
+    else:
+        field_score = 1.0 if found else 0.0
+
+    confidence = 0.3 * keyword_score + 0.7 * field_score
+    if keyword_hits < MIN_KEYWORD_HITS or not found.intersection(NAME_FIELDS):
+        confidence = min(confidence, LOW_EVIDENCE_CONFIDENCE)
+    logger.debug(f"Template '{doc_type}' matched {len(found)} fields (confidence {confidence:.2f})")
+    return structured_info, confidence
+
+def extract_with_rules(text):
+    """
+    Extract structured information from document text using local rules only
+
+    Args:
+        text (str): Text content of the document
+
+    Returns:
+        dict: Analysis result in the same format as analyze_document, with an added
+              'confidence' score, or None if no rule matched the document
+    """
+    if not text:
+        return None
+
+    candidates = []
+
+    mrz = parse_mrz(text)
+    if mrz:
+        candidates.append(_mrz_analysis(mrz))
+
+    for doc_type, template in TEMPLATES.items():
+        structured_info, confidence = _template_analysis(text, doc_type, template)
+        if structured_info:
+            candidates.append((structured_info, confidence))
+
+    if not candidates:
+        return None
+
+    structured_info, confidence = max(candidates, key=lambda candidate: candidate[1])
+
+    for name, pattern in COMMON_FIELDS.items():
+        match = pattern.search(text)
+        if match:
+            _set_field(structured_info, name, _clean_value(match.group(1)))
+
+    return {
+        'success': True,
+        'analysis_source': 'local',
+        'confidence': round(confidence, 2),
+        'structured_info': structured_info,
+    }
+
+def merge_structured_info(primary, secondary):
+    """
+    Fill missing or empty values in one structured_info dictionary from another
+
+    Args:
+        primary (dict): Structured information whose values take precedence (modified in place)
+        secondary (dict): Structured information used to fill the gaps
+
+    Returns:
+        dict: The merged primary dictionary
+    """
+    for key, value in secondary.items():
+        current = primary.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            merge_structured_info(current, value)
+        elif not current or current == 'Unknown':
+            primary[key] = value
+    return primary
+
+def _label(label):
+    """Regex for a 'Label:' at the start of a line"""
+    return r'^[ \t]*(?:' + label + r')[ \t]*:'
+
+# Regex fragment for the value after a label, stopping at the end of the line
+_VALUE = r'[ \t]*([^\n]+)'
+# Up to five name-shaped words, ending at the line end, a comma or a relation (s/o, son of, ...)
+_NAME = (
+    r"[ \t]*[:\-]?[ \t]*([A-Za-z][A-Za-z.']*(?:[ \t]+[A-Za-z][A-Za-z.']*){0,4}?)"
+    r"(?=[ \t]*(?:,|$)|[ \t]+(?:s/o|d/o|w/o|son of|daughter of|wife of)\b)"
+)
+_DATE = r'\s*[:\-]?\s*(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4}|\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4})'
+# Unlabelled name line directly above the date of birth, as printed on ID cards
+_NAME_ABOVE_DOB = (
+    r"^[ \t]*(?:name[ \t]*:[ \t]*)?(?![^\n]*\b(?:government|india|authority|aadhaar)\b)"
+    r"([A-Za-z][A-Za-z.']*(?:[ \t]+[A-Za-z][A-Za-z.']*){1,4})[ \t]*\n"
+    r"[^\n]*(?:date of birth|d\.?o\.?b|year of birth)"
+)
+
+register_template(
+    'ssc_certificate', 'SSC Certificate',
+    keywords=['secondary school certificate', 'board of secondary education', 'ssc examination', 'grade point average'],
+    fields={
+        'personal_info.name': r'(?:\bcertified that|' + _label(r'name of the candidate|candidate\'?s? name') + ')' + _NAME,
+        'personal_info.father_name': _label(r'father\'?s?\s+name') + _NAME,
+        'personal_info.mother_name': _label(r'mother\'?s?\s+name') + _NAME,
+        'personal_info.date_of_birth': r'(?:date of birth|d\.?o\.?b\.?)' + _DATE,
+        'document_details.roll_number': r'(?:roll|hall ticket)\s*(?:no\.?|number)\s*[:\-]?\s*([A-Z0-9]{6,})',
+        'document_details.school': _label(r'(?:name of the )?school(?: name)?') + _VALUE,
+        'document_details.examination': _label(r'examination held in|month\s*(?:&|and)\s*year of exam') + _VALUE,
+        'document_details.grade_point_average': r'(?:cumulative\s+)?grade point average\s*\(?c?gpa\)?\s*[:\-]?\s*(\d{1,2}(?:\.\d{1,2})?)',
+    },
+    required=('personal_info.name', 'personal_info.date_of_birth', 'document_details.roll_number'),
+)
+
+register_template(
+    'pan_card', 'PAN Card',
+    keywords=['income tax department', 'permanent account number'],
+    fields={
+        'document_details.pan_number': r'\b([A-Z]{5}[0-9]{4}[A-Z])\b',
+        'personal_info.name': _label(r'name') + _NAME,
+        'personal_info.father_name': _label(r'father\'?s?\s+name') + _NAME,
+        'personal_info.date_of_birth': r'(?:date of birth|d\.?o\.?b\.?)' + _DATE,
+    },
+    required=('document_details.pan_number', 'personal_info.name', 'personal_info.date_of_birth'),
+)
+
+register_template(
+    'aadhaar_card', 'Aadhaar Card',
+    keywords=['aadhaar', 'unique identification authority', 'uidai'],
+    fields={
+        'document_details.aadhaar_number': r'(?<!\d)(\d{4}\s\d{4}\s\d{4})(?!\d)',
+        'personal_info.name': _NAME_ABOVE_DOB,
+        'personal_info.date_of_birth': r'(?:date of birth|d\.?o\.?b\.?|year of birth)' + _DATE,
+        'personal_info.gender': r'\b(male|female|transgender)\b',
+    },
+    required=('document_details.aadhaar_number', 'personal_info.name', 'personal_info.date_of_birth'),
+)
+
+register_template(
+    'passport', 'Passport',
+    keywords=['passport', 'republic of india', 'place of issue'],
+    fields={
+        'document_details.document_number': r'passport\s*no\.?' + r'\s*[:\-]?\s*([A-Z][0-9]{7})',
+        'personal_info.surname': _label(r'surname') + _NAME,
+        'personal_info.given_names': _label(r'given\s+name\(?s?\)?') + _NAME,
+        'personal_info.date_of_birth': r'date of birth' + _DATE,
+        'personal_info.place_of_birth': _label(r'place of birth') + _VALUE,
+        'document_details.expiry_date': r'date of expiry' + _DATE,
+    },
+    required=('document_details.document_number', 'personal_info.surname', 'personal_info.date_of_birth'),
+)
+
+register_template(
+    'income_certificate', 'Income Certificate',
+    keywords=['income certificate', 'annual income'],
+    fields={
+        'personal_info.name': r'(?:\bcertified that|' + _label(r'name of the applicant|applicant name') + ')' + _NAME,
+        'personal_info.father_name': r'(?:\b[sd]/o\.?|' + _label(r'father\'?s?\s+name') + ')' + _NAME,
+        'document_details.annual_income': r'annual income[^\d\n]*([\d,]+(?:\.\d{2})?)',
+        'document_details.certificate_number': r'certificate\s*no\.?\s*[:\-]?\s*([A-Z0-9\/\-]{6,})',
+    },
+    required=('personal_info.name', 'document_details.annual_income'),
+)
+
+register_template(
+    'caste_certificate', 'Caste Certificate',
+    keywords=['caste certificate', 'community certificate', 'belongs to'],
+    fields={
+        'personal_info.name': r'(?:\bcertified that|' + _label(r'name of the applicant|applicant name') + ')' + _NAME,
+        'personal_info.father_name': r'(?:\b[sd]/o\.?|' + _label(r'father\'?s?\s+name') + ')' + _NAME,
+        'document_details.caste': _label(r'caste|community') + _VALUE,
+        'document_details.certificate_number': r'certificate\s*no\.?\s*[:\-]?\s*([A-Z0-9\/\-]{6,})',
+    },
+    required=('personal_info.name', 'document_details.caste'),
+)
+
+register_template(
+    'bank_statement', 'Bank Statement',
+    keywords=['statement of account', 'account statement', 'ifsc'],
+    fields={
+        'personal_info.name': _label(r'(?:account holder|customer)(?:\'?s)?\s*name|account holder') + _NAME,
+        'document_details.account_number': r'(?:a/c|account)\s*(?:no\.?|number)\s*[:\-]?\s*(\d{9,18})',
+        'document_details.ifsc_code': r'\b([A-Z]{4}0[A-Z0-9]{6})\b',
+        'document_details.statement_period': _label(r'(?:statement\s+)?period') + _VALUE,
+    },
+    required=('personal_info.name', 'document_details.account_number'),
+)
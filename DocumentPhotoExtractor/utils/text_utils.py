@@ -0,0 +1,185 @@
+"""
+Text compaction and chunking before AI analysis
+
+Native PDF text and OCR text of the same page overlap heavily, and long documents carry
+page numbers, running headers and separators that add tokens without adding information.
+These helpers reduce the prompt to the lines that matter and split what remains into
+chunks that can be analyzed concurrently.
+"""
+
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.rule_utils import merge_structured_info
+
+logger = logging.getLogger(__name__)
+
+# Lines that carry no information for field extraction
+BOILERPLATE_PATTERNS = [
+    re.compile(r'^(?:page\s*\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?|\d{1,4}\s*(?:of|/)\s*\d{1,4})$', re.IGNORECASE),
+    re.compile(r'^[\W_]+$'),
+    re.compile(r'^(?:continued|contd\.?|this is a computer generated .*)$', re.IGNORECASE),
+]
+
+# Words that usually sit next to the personal details we extract
+FIELD_KEYWORDS = [
+    'name', 'father', 'mother', 'husband', 'guardian', 'date of birth', 'dob', 'born',
+    'gender', 'sex', 'nationality', 'address', 'passport', 'certificate', 'number', 'no.',
+    'roll', 'registration', 'account', 'ifsc', 'pan', 'aadhaar', 'caste', 'income',
+    'issued', 'expiry', 'valid', 'email', 'phone', 'mobile', 'school', 'board', 'grade',
+]
+
+# Values that look like extractable fields even without a label
+FIELD_PATTERNS = [
+    re.compile(r'\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4}'),
+    re.compile(r'\b[A-Z0-9]{8,}\b'),
+    re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}'),
+    re.compile(r'[A-Z0-9<]{20,}'),
+]
+
+# Number of leading lines always kept, since they usually name the document
+HEADER_LINES = 5
+
+def _line_key(line):
+    """
+    Normalise a line so native and OCR variants of the same text compare equal
+
+    Spacing and punctuation are dropped (in any script), except punctuation between
+    digits, so "9.8" and "98" stay different.
+    """
+    return re.sub(r'(?!(?<=\d)[.,/:-](?=\d))[\W_]', '', line.lower())
+
+def _is_boilerplate(line):
+    return any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS)
+
+def _line_score(line):
+    lowered = line.lower()
+    score = sum(2 for keyword in FIELD_KEYWORDS if keyword in lowered)
+    score += sum(1 for pattern in FIELD_PATTERNS if pattern.search(line))
+    return score
+
+def compact_text(native_text, ocr_text=None, max_chars=None):
+    """
+    Deduplicate, strip boilerplate and, if needed, keep only the most relevant lines
+
+    Args:
+        native_text (str): Text extracted directly from the document
+        ocr_text (str, optional): Text recognised by OCR
+        max_chars (int, optional): Maximum length of the compacted text
+
+    Returns:
+        str: Compacted text, with lines kept in their original order
+    """
+    def clean_lines(source):
+        for raw_line in (source or '').splitlines():
+            line = re.sub(r'[ \t]+', ' ', raw_line).strip()
+            if line and not _is_boilerplate(line):
+                yield line
+
+    # Native text is kept as is (repeated lines such as grades are real data); only OCR
+    # lines that repeat a native line are dropped
+    lines = list(clean_lines(native_text))
+    native_keys = {_line_key(line) for line in lines}
+    lines.extend(line for line in clean_lines(ocr_text) if _line_key(line) not in native_keys)
+
+    compacted = '\n'.join(lines)
+    if not max_chars or len(compacted) <= max_chars:
+        return compacted
+
+    # Rank lines by how likely they hold fields and keep their immediate neighbours too,
+    # since labels and values are often split across lines
+    scores = [_line_score(line) for line in lines]
+    ranked = sorted(
+        (i for i, score in enumerate(scores) if score > 0),
+        key=lambda i: scores[i],
+        reverse=True,
+    )
+
+    # The header lines come first, but like every other line only while they fit
+    selected = set()
+    used = 0
+    for i in range(min(HEADER_LINES, len(lines))):
+        if used + len(lines[i]) + 1 > max_chars:
+            break
+        selected.add(i)
+        used += len(lines[i]) + 1
+    for i in ranked:
+        for j in (i, i - 1, i + 1):
+            if 0 <= j < len(lines) and j not in selected and used + len(lines[j]) + 1 <= max_chars:
+                selected.add(j)
+                used += len(lines[j]) + 1
+
+    result = '\n'.join(lines[i] for i in sorted(selected))
+    logger.debug(f"Compacted text from {len(compacted)} to {len(result)} characters")
+    return result
+
+def chunk_text(text, chunk_chars):
+    """
+    Split text on line boundaries into chunks of at most chunk_chars characters
+
+    Args:
+        text (str): Text to split
+        chunk_chars (int): Maximum chunk length
+
+    Returns:
+        list: Text chunks
+    """
+    chunks = []
+    current = []
+    size = 0
+    for line in text.splitlines():
+        # Hard-wrap lines that are longer than a whole chunk, after the lines before them
+        if len(line) > chunk_chars and current:
+            chunks.append('\n'.join(current))
+            current = []
+            size = 0
+        while len(line) > chunk_chars:
+            chunks.append(line[:chunk_chars])
+            line = line[chunk_chars:]
+        if current and size + len(line) + 1 > chunk_chars:
+            chunks.append('\n'.join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+def analyze_in_chunks(text, analyze_func, chunk_chars, max_chunks=None, max_workers=4):
+    """
+    Analyze text with analyze_func, splitting it into concurrently analyzed chunks if it is long
+
+    Args:
+        text (str): Text to analyze
+        analyze_func (callable): Function taking text and returning an analysis dict
+        chunk_chars (int): Maximum length of each chunk
+        max_chunks (int, optional): Maximum number of chunks to analyze
+        max_workers (int, optional): Number of concurrent analysis calls
+
+    Returns:
+        dict: Analysis of the first chunk with gaps filled from the following chunks
+    """
+    if len(text) <= chunk_chars:
+        return analyze_func(text)
+
+    chunks = chunk_text(text, chunk_chars)
+    if max_chunks and len(chunks) > max_chunks:
+        logger.warning(f"Analyzing first {max_chunks} of {len(chunks)} text chunks")
+        chunks = chunks[:max_chunks]
+    logger.debug(f"Analyzing {len(chunks)} text chunks concurrently")
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        results = list(executor.map(analyze_func, chunks))
+
+    # Earlier chunks win; later chunks only fill the fields that are still missing
+    merged = dict(results[0])
+    merged['structured_info'] = dict(merged.get('structured_info') or {})
+    for result in results[1:]:
+        merged['success'] = merged.get('success', False) or result.get('success', False)
+        merged['api_available'] = merged.get('api_available', False) or result.get('api_available', False)
+        if isinstance(result.get('structured_info'), dict):
+            merge_structured_info(merged['structured_info'], result['structured_info'])
+    merged['chunks_analyzed'] = len(chunks)
+    return merged
@@ -0,0 +1,155 @@
+"""
+Time-limited execution of processing stages
+
+Heavy stages (rasterization, OCR, face detection) run in a separate process so a
+pathological document can be killed when its time budget runs out, instead of holding
+a batch worker or web request forever. Light stages can run in a thread, which is
+abandoned (not killed) on timeout.
+"""
+
+import os
+import signal
+import logging
+import threading
+import multiprocessing
+from multiprocessing import forkserver
+
+logger = logging.getLogger(__name__)
+
+class StageTimeout(Exception):
+    """Raised when a processing stage does not finish within its time budget"""
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+def _get_context(start_method=None, preload_modules=None):
+    """Return a cached multiprocessing context, preferring a preloaded fork server"""
+    if start_method is None:
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+    with _contexts_lock:
+        if start_method not in _contexts:
+            context = multiprocessing.get_context(start_method)
+            if start_method == 'forkserver':
+                # The fork server imports these once; each stage process is a cheap fork of
+                # it. '__main__' asks it to import the entry script too, where the Python
+                # version supports that; otherwise each stage re-imports the script as
+                # __mp_main__, which is cheap once its imports are preloaded
+                context.set_forkserver_preload(['__main__'] + list(preload_modules or []))
+            _contexts[start_method] = context
+        return _contexts[start_method]
+
+def start_stage_server(start_method=None, preload_modules=None):
+    """
+    Start the stage fork server now rather than on the first isolated stage
+
+    The fork server belongs to the process that starts it, so a pre-fork server calls
+    this in each worker after it is forked; the first request then does not wait for
+    the server to start and import its preload modules.
+
+    Args:
+        start_method (str, optional): Multiprocessing start method for isolated stages
+        preload_modules (list, optional): Modules the fork server imports up front
+    """
+    context = _get_context(start_method, preload_modules)
+    if context.get_start_method() != 'forkserver':
+        return
+    forkserver.ensure_running()
+    logger.debug("Stage fork server started")
+
+def _stage_worker(conn, func, args):
+    if hasattr(os, 'setpgid'):
+        # Lead a process group of our own, so a timeout also reaches the tools this
+        # stage starts (pdftoppm, tesseract) instead of leaving them orphaned
+        os.setpgid(0, 0)
+    try:
+        conn.send((True, func(*args)))
+    except Exception as e:
+        # Exceptions are not always picklable, so only their message crosses the pipe
+        conn.send((False, f"{type(e).__name__}: {str(e)}"))
+    finally:
+        conn.close()
+
+def _signal_stage(process, sig, fallback):
+    """Send sig to the stage's process group, or fall back to signalling the process"""
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, sig)
+            return
+        except OSError:
+            # The group is gone, or the stage has not created it yet
+            pass
+    if process.is_alive():
+        fallback()
+
+def _run_in_process(func, args, timeout, start_method, preload_modules):
+    context = _get_context(start_method, preload_modules)
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_stage_worker, args=(child_conn, func, args), daemon=True)
+    process.start()
+    child_conn.close()
+
+    try:
+        if not parent_conn.poll(timeout):
+            raise StageTimeout(f"{func.__name__} did not finish within {timeout:.1f}s")
+        try:
+            ok, value = parent_conn.recv()
+        except EOFError:
+            raise RuntimeError(f"{func.__name__} worker exited unexpectedly")
+    finally:
+        parent_conn.close()
+        if process.is_alive():
+            _signal_stage(process, signal.SIGTERM, process.terminate)
+            process.join(1)
+            # Kill whatever ignored SIGTERM, including helpers that outlived the stage
+            _signal_stage(process, getattr(signal, 'SIGKILL', signal.SIGTERM), process.kill)
+        process.join()
+
+    if not ok:
+        raise RuntimeError(value)
+    return value
+
+def _run_in_thread(func, args, timeout):
+    outcome = {}
+
+    def target():
+        try:
+            outcome['value'] = func(*args)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, name=f"stage-{func.__name__}", daemon=True)
+    thread.start()
+    thread.join(timeout)
+
+    if thread.is_alive():
+        raise StageTimeout(f"{func.__name__} did not finish within {timeout:.1f}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
+
+def run_stage(func, *args, timeout=None, isolate=True, start_method=None, preload_modules=None):
+    """
+    Run func(*args) with a time limit
+
+    Args:
+        func (callable): Module-level function to run (must be picklable when isolated)
+        *args: Arguments for func (must be picklable when isolated)
+        timeout (float, optional): Seconds to wait; None runs func inline without a limit
+        isolate (bool, optional): Run in a killable subprocess rather than a thread
+        start_method (str, optional): Multiprocessing start method for isolated stages
+        preload_modules (list, optional): Modules the fork server imports up front
+
+    Returns:
+        The value returned by func
+
+    Raises:
+        StageTimeout: If func does not finish in time
+    """
+    if timeout is None:
+        return func(*args)
+    if timeout <= 0:
+        raise StageTimeout(f"No time left to run {func.__name__}")
+    if isolate:
+        return _run_in_process(func, args, timeout, start_method, preload_modules)
+    return _run_in_thread(func, args, timeout)
@@ -0,0 +1,142 @@
+"""
+Production WSGI server for the web application
+
+Runs the Flask app under gunicorn with a pre-fork model: heavy libraries and detector
+models are loaded once in the master process so workers share them copy-on-write,
+workers are recycled after a number of requests, and shutdown drains in-flight requests.
+
+Usage:
+    python main.py server --production --workers 4 --threads 8
+"""
+
+import gc
+import os
+import logging
+import tempfile
+import importlib
+
+from PIL import Image
+
+from app import app, bulk_executor
+from utils.image_utils import extract_images, extract_faces
+from utils.ocr_utils import perform_ocr
+from utils.timeout_utils import start_stage_server
+from config import (
+    WARMUP_MODULES, STAGE_ISOLATION, STAGE_START_METHOD, STAGE_PRELOAD_MODULES,
+    SERVER_WORKERS, SERVER_THREADS, SERVER_MAX_REQUESTS, SERVER_MAX_REQUESTS_JITTER,
+    SERVER_TIMEOUT, SERVER_GRACEFUL_TIMEOUT
+)
+
+try:
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    BaseApplication = object
+    GUNICORN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+def _warm_engines():
+    """Run face detection and OCR once on a tiny blank image to initialise their engines"""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
+    temp_file.close()
+    try:
+        Image.new('RGB', (64, 64), 'white').save(temp_file.name)
+        for img in extract_images(temp_file.name, 'image'):
+            extract_faces(img)
+        perform_ocr(temp_file.name, 'image')
+        logger.debug("Face detection and OCR engines warmed up")
+    except Exception as e:
+        logger.warning(f"Engine warmup failed: {str(e)}")
+    finally:
+        os.unlink(temp_file.name)
+
+def warmup():
+    """
+    Load heavy libraries and engines once so that forked workers inherit them
+
+    The document processing modules (and any models they load at import time) are
+    already imported with the app; this adds the libraries that are imported lazily
+    and runs face detection and OCR once so their models are loaded.
+    """
+    for module_name in WARMUP_MODULES:
+        try:
+            importlib.import_module(module_name)
+            logger.debug(f"Preloaded {module_name}")
+        except ImportError:
+            logger.debug(f"Skipping preload of {module_name}: not installed")
+
+    _warm_engines()
+
+    # Move everything loaded so far out of the garbage collector's reach, so collections
+    # in the workers do not touch (and copy) the pages shared with the master
+    gc.collect()
+    gc.freeze()
+
+def _post_fork(server, worker):
+    """Start the worker's fork server for isolated stages before it takes requests"""
+    if STAGE_ISOLATION:
+        start_stage_server(STAGE_START_METHOD, STAGE_PRELOAD_MODULES)
+
+def _worker_exit(server, worker):
+    """
+    Drop queued bulk documents; their requests have already been drained or abandoned
+
+    Cancelled jobs remove their spooled temp files through the done callback added in
+    _submit_bulk_document, so recycled workers do not leave uploads behind.
+    """
+    bulk_executor.shutdown(wait=False, cancel_futures=True)
+
+class ProductionServer(BaseApplication):
+    """
+    Gunicorn application serving an already imported WSGI app
+    """
+
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+def run_production_server(host='0.0.0.0', port=5000, workers=None, threads=None,
+                          max_requests=None, timeout=None, graceful_timeout=None):
+    """
+    Start the web application under gunicorn
+
+    Args:
+        host (str): Host to bind the server to
+        port (int): Port to bind the server to
+        workers (int, optional): Number of worker processes
+        threads (int, optional): Number of request threads per worker
+        max_requests (int, optional): Requests after which a worker is recycled (0 disables)
+        timeout (int, optional): Seconds a worker may be silent before it is restarted (0 disables)
+        graceful_timeout (int, optional): Seconds workers get to finish requests on shutdown
+    """
+    if not GUNICORN_AVAILABLE:
+        raise RuntimeError("gunicorn is not installed (pip install gunicorn)")
+
+    warmup()
+
+    threads = threads or SERVER_THREADS
+    options = {
+        'bind': f"{host}:{port}",
+        'workers': workers or SERVER_WORKERS,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'max_requests': SERVER_MAX_REQUESTS if max_requests is None else max_requests,
+        'max_requests_jitter': SERVER_MAX_REQUESTS_JITTER,
+        'timeout': SERVER_TIMEOUT if timeout is None else timeout,
+        'graceful_timeout': SERVER_GRACEFUL_TIMEOUT if graceful_timeout is None else graceful_timeout,
+        'preload_app': True,
+        'post_fork': _post_fork,
+        'worker_exit': _worker_exit,
+    }
+    logger.info(f"Starting production server with {options['workers']} workers x {threads} threads")
+    ProductionServer(app, options).run()